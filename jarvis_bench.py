@@ -0,0 +1,465 @@
+# jarvis_bench.py
+# Offline benchmarks for jarvis_logic (no Ollama or internet needed)
+import argparse
+import asyncio
+import functools
+import json
+import math
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import jarvis_logic
+from jarvis_cache import TTLCache
+from jarvis_journal import InteractionJournal
+
+# ------------------ Prompt Corpus ------------------
+# (prompt, expected search trigger or None)
+PROMPT_CORPUS = [
+    ("What's the weather in Budapest?", "weather"),
+    ("what is the weather like today", "weather"),
+    ("Will it rain tomorrow? Check the forecast for Debrecen", "weather"),
+    ("Milyen az időjárás Budapesten ma?", "weather"),
+    ("Milyen idő lesz holnap? Nézd meg az időjárás előrejelzést", "weather"),
+    ("What's the temperature outside right now?", "temperature"),
+    ("Hány fok van most Szegeden?", "temperature"),
+    ("Latest news about AI", "news"),
+    ("Any news on the Mars mission?", "news"),
+    ("Mik a legfrissebb hírek?", "news"),
+    ("Apple stock price", "stock"),
+    ("How are Tesla stocks doing today?", "stock"),
+    ("Mennyi az OTP részvény árfolyama?", "stock"),
+    ("What's the price of bitcoin?", "price"),
+    ("Mennyibe kerül egy új iPhone?", "price"),
+    ("What was the score of the Lakers game?", "score"),
+    ("Who won the Arsenal match yesterday?", "match"),
+    ("Mi lett a Fradi meccs eredménye?", "score"),
+    ("When is the next solar eclipse?", "when"),
+    ("Mikor lesz a következő napfogyatkozás?", "when"),
+    ("What happened today in tech?", "today"),
+    ("What are you doing now?", "now"),
+    ("What's the current version of Python?", "current"),
+    ("What's the latest iPhone model?", "latest"),
+    ("Do you know who wrote Dune?", None),
+    ("I like dogs", None),
+    ("Tell me a joke", None),
+    ("What's 15 * 23?", None),
+    ("What time is it?", None),
+    ("Explain how a transformer network works", None),
+    ("Can you acknowledge my request?", None),
+    ("Write a short poem about autumn", None),
+    ("Szia, hogy vagy?", None),
+    ("Mesélj egy viccet", None),
+    ("Ki vagy te?", None),
+    ("Render a titanium cube", None),
+    ("Is snow white?", None),
+    ("Summarize the plot of Hamlet", None),
+    ("How do I reverse a list in Python?", None),
+    ("What's your favourite color?", None),
+]
+
+# ------------------ Legacy Matcher (baseline) ------------------
+LEGACY_TRIGGERS = [
+    ('weather', True), ('temperature', True), ('news', True), ('stock', True),
+    ('price', True), ('score', True), ('match', True), ('when', False),
+    ('today', False), ('now', False), ('current', False), ('latest', False),
+]
+
+def legacy_match_trigger(user_input):
+    """The old substring scan of should_auto_search (first substring hit wins)"""
+    user_lower = user_input.lower()
+    for trigger, _ in LEGACY_TRIGGERS:
+        if trigger in user_lower:
+            return trigger
+    return None
+
+def compiled_match_trigger(user_input):
+    return jarvis_logic.match_search_trigger(user_input)[0]
+
+# ------------------ Helpers ------------------
+def time_per_call(func, prompts, iterations):
+    """Average microseconds per call of func over the prompt list"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for prompt in prompts:
+            func(prompt)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(prompts)) * 1e6
+
+def accuracy(func, corpus):
+    """Returns (correct, mistakes) where mistakes is a list of (prompt, expected, got)"""
+    mistakes = []
+    for prompt, expected in corpus:
+        got = func(prompt)
+        if got != expected:
+            mistakes.append((prompt, expected, got))
+    return len(corpus) - len(mistakes), mistakes
+
+# ------------------ Trigger Benchmark ------------------
+def bench_triggers(iterations=2000):
+    """Compare the compiled trigger matcher with the legacy substring scan"""
+    prompts = [prompt for prompt, _ in PROMPT_CORPUS]
+    print(f"\nTrigger detection ({len(prompts)} prompts x {iterations} iterations)")
+    print("-" * 60)
+
+    results = {}
+    for name, func in [("legacy", legacy_match_trigger), ("compiled", compiled_match_trigger)]:
+        per_call = time_per_call(func, prompts, iterations)
+        correct, mistakes = accuracy(func, PROMPT_CORPUS)
+        results[name] = {"us_per_call": round(per_call, 3), "correct": correct, "total": len(PROMPT_CORPUS)}
+        print(f"{name:>10}: {per_call:7.2f} µs/call   accuracy {correct}/{len(PROMPT_CORPUS)}")
+        for prompt, expected, got in mistakes:
+            print(f"{'':>12}✗ {prompt!r}: expected {expected}, got {got}")
+
+    # The full should_auto_search path (includes query building for hits)
+    per_call = time_per_call(jarvis_logic.should_auto_search, prompts, iterations)
+    results["should_auto_search"] = {"us_per_call": round(per_call, 3)}
+    print(f"{'should_auto_search':>10}: {per_call:7.2f} µs/call")
+    return results
+
+# ------------------ Pipeline Corpus ------------------
+# (prompt, first model reply, reply after a TOOL/SEARCH result or None)
+PIPELINE_CORPUS = [
+    ("Hello JARVIS, how are you?", "I'm running at full capacity, sir. How can I help?", None),
+    ("Tell me a joke", "Why did the robot go on vacation? It needed to recharge its batteries.", None),
+    ("What time is it?", 'TOOL("time")', "It's just past the hour, sir."),
+    ("What's 15 * 23?", 'TOOL("calculate", "15*23")', "That's 345."),
+    ("What day is it today?", 'TOOL("day")', "It's a fine day, sir."),
+    ("What's the weather in Budapest?", 'SEARCH("weather Budapest today")', "It's 14°C and partly cloudy in Budapest."),
+    ("Latest news about AI", 'SEARCH("latest AI news")', "The big story today is a new open model release."),
+    ("Who is the CEO of Tesla right now?", 'SEARCH("Tesla CEO")', "Elon Musk is still the CEO of Tesla."),
+    ("Explain how a transformer network works",
+     "A transformer maps tokens to vectors and lets every token attend to every other one. "
+     "Stacked attention and feed-forward layers then refine those vectors into predictions.", None),
+    ("Mesélj egy viccet", "Miért nem játszik a csontváz focit? Mert nincs szíve hozzá.", None),
+]
+
+# ------------------ Stand-ins for Ollama and DuckDuckGo ------------------
+# Corpus markers, turned into structured tool calls when askAI sends `tools`
+STUB_TOOL_PATTERN = re.compile(r'TOOL\("(\w+)"(?:\s*,\s*"([^"]*)")?\)')
+STUB_SEARCH_PATTERN = re.compile(r'SEARCH\("([^"]*)"\)')
+
+class StubOllama:
+    """
+    Replaces the ollama module: replies come from the corpus, tokens are
+    streamed at `tokens_per_second` after `latency` seconds (time to first token).
+    Models report tool support; with `tools` in the request, TOOL()/SEARCH()
+    replies come back as native tool calls.
+    """
+
+    def __init__(self, replies, tokens_per_second=200.0, latency=0.05):
+        self.replies = replies   # prompt -> (first reply, follow-up reply)
+        self.tokens_per_second = tokens_per_second
+        self.latency = latency
+
+    def reply_for(self, messages):
+        if messages[-1]["role"] == "tool":
+            question = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+            first, followup = self.replies.get(question, ("", None))
+            return followup or "Done, sir."
+        last = messages[-1]["content"]
+        if last.startswith(("[TOOL RESULT", "[SEARCH RESULTS", "Tool failed", "The search failed")):
+            question = next(m["content"] for m in reversed(messages[:-2]) if m["role"] == "user")
+            first, followup = self.replies.get(question, ("", None))
+            return followup or "Done, sir."
+        first, _ = self.replies.get(last, ("Understood, sir.", None))
+        return first
+
+    @staticmethod
+    def tokens(text):
+        return re.findall(r'\S+\s*|\s+', text)
+
+    def chunk(self, text, done=False):
+        return {"message": {"role": "assistant", "content": text}, "done": done}
+
+    @staticmethod
+    def tool_calls(text):
+        """TOOL()/SEARCH() markers of a reply as Ollama tool calls"""
+        calls = []
+        for name, args in STUB_TOOL_PATTERN.findall(text):
+            calls.append({"function": {"name": name, "arguments": {"args": args} if args else {}}})
+        for query in STUB_SEARCH_PATTERN.findall(text):
+            calls.append({"function": {"name": jarvis_logic.WEB_SEARCH_TOOL_NAME, "arguments": {"query": query}}})
+        return calls
+
+    def final_chunk(self, messages, tokens):
+        """Last stream chunk with Ollama-style token counts and nanosecond durations"""
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        return {
+            **self.chunk("", done=True),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(self.latency * 1e9),
+            "eval_count": tokens,
+            "eval_duration": int(tokens / self.tokens_per_second * 1e9),
+            "load_duration": 0
+        }
+
+    # Sync API (warm-up, summaries, scene descriptions, embeddings)
+    def chat(self, model=None, messages=None, stream=False, **kwargs):
+        time.sleep(self.latency)
+        return self.chunk(self.reply_for(messages), done=True)
+
+    def show(self, model=None):
+        return {"capabilities": ["completion", "tools"]}
+
+    def generate(self, model=None, prompt=None, **kwargs):
+        time.sleep(self.latency)
+        return {"response": "A short summary of the conversation."}
+
+    def embed(self, model=None, input=None, **kwargs):
+        """Hashed bag-of-words vectors (32 dims)"""
+        texts = input if isinstance(input, list) else [input]
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 32
+            for word in re.findall(r'\w+', text.lower()):
+                vector[hash(word) % 32] += 1.0
+            vectors.append(vector)
+        return {"embeddings": vectors}
+
+    # Async API (askAI streaming)
+    def AsyncClient(self, *args, **kwargs):
+        return StubAsyncClient(self)
+
+    async def _stream(self, messages, text, calls=None):
+        await asyncio.sleep(self.latency)
+        if calls:
+            # Ollama sends a tool call as one chunk with no content
+            yield {"message": {"role": "assistant", "content": "", "tool_calls": calls}, "done": False}
+            yield self.final_chunk(messages, 1)
+            return
+        tokens = self.tokens(text)
+        for token in tokens:
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield self.chunk(token)
+        yield self.final_chunk(messages, len(tokens))
+
+    async def achat(self, model=None, messages=None, stream=False, tools=None, **kwargs):
+        text = self.reply_for(messages)
+        calls = self.tool_calls(text) if tools else None
+        if stream:
+            return self._stream(messages, text, calls)
+        await asyncio.sleep(self.latency)
+        return self.chunk(text, done=True)
+
+class StubAsyncClient:
+    """What ollama.AsyncClient() returns: forwards to the StubOllama"""
+
+    def __init__(self, stub):
+        self.stub = stub
+
+    async def chat(self, **kwargs):
+        return await self.stub.achat(**kwargs)
+
+def make_stub_ddgs(latency=0.2):
+    """DDGS replacement returning 8 plausible results after `latency` seconds"""
+    class StubDDGS:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def text(self, query, max_results=8):
+            time.sleep(latency)
+            return [
+                {
+                    "title": f"{query.title()} - Source {i}",
+                    "body": f"Latest information about {query}. Result {i} has the details you asked for. "
+                            f"Updated today with current figures. Read more on the website.",
+                    "href": f"https://example{i}.com/{'-'.join(query.split())}"
+                }
+                for i in range(1, max_results + 1)
+            ]
+    return StubDDGS
+
+# ------------------ Stage Timers ------------------
+# Stage name -> jarvis_logic function that is wrapped with a timer
+PIPELINE_STAGES = [
+    ("config_load", "load_config"),
+    ("history_load", "assemble_history"),
+    ("history_save", "append_history"),
+    ("trigger_detection", "should_auto_search"),
+    ("search", "fetch_search_results"),
+    ("tool_execution", "execute_system_tool"),
+    ("generation", "stream_chat_async"),
+]
+
+class StageTimer:
+    """Accumulates time spent per stage during the current turn"""
+
+    def __init__(self):
+        self.current = {}
+
+    def add(self, stage, elapsed):
+        self.current[stage] = self.current.get(stage, 0.0) + elapsed
+
+    def wrap(self, stage, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.add(stage, time.perf_counter() - start)
+            return timed_async
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct * len(ordered) / 100) - 1))
+    return ordered[rank]
+
+def summarize(values):
+    ms = [v * 1000 for v in values]
+    return {
+        "n": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3)
+    }
+
+# ------------------ Pipeline Benchmark ------------------
+def patch_pipeline(workdir, stub, ddgs, timer, fast_path=False, native_tools=True):
+    """Point jarvis_logic at temp files and the stand-ins, returns an undo function"""
+    jl = jarvis_logic
+    saved = {}
+
+    def patch(name, value):
+        saved[name] = getattr(jl, name, None)
+        setattr(jl, name, value)
+
+    config_file = workdir / "config.yaml"
+    patch("CONFIG_FILE", config_file)
+    patch("HISTORY_FILE", workdir / "chat_history.json")
+    patch("CONTEXT_FILE", workdir / "conversation_context.json")
+    patch("DB_FILE", workdir / "jarvis.db")
+    patch("_store", None)
+    patch("_config_cache", None)
+    patch("_config_last_modified", None)
+    patch("search_cache", TTLCache(jl.SEARCH_CACHE_SIZE))
+    patch("journal", InteractionJournal(workdir / "logs" / "interactions.jsonl"))
+    patch("ollama", stub)
+    patch("OLLAMA_AVAILABLE", True)
+    patch("DDGS", ddgs)
+    patch("WEB_SEARCH_AVAILABLE", True)
+    patch("_tool_support", {})
+    patch("_tool_support_failed", {})
+    jl._async_clients.clear()
+    # The fast path answers the time/day/arithmetic prompts without the model,
+    # so by default it is off and those prompts exercise TOOL() handling
+    jl.save_config(dict(jl.DEFAULT_CONFIG, fast_path=fast_path, native_tools=native_tools))
+    for stage, name in PIPELINE_STAGES:
+        patch(name, timer.wrap(stage, getattr(jl, name)))
+
+    def undo():
+        jl.journal.close()
+        if jl._store is not None:
+            jl._store.close()
+        for name, value in saved.items():
+            setattr(jl, name, value)
+        jl._async_clients.clear()
+    return undo
+
+def bench_pipeline(rounds=5, tokens_per_second=200.0, latency=0.05, search_latency=0.2, search_cache=False,
+                   fast_path=False, native_tools=True):
+    """
+    Replay the corpus through askAI against the stand-ins and report
+    per-stage timings. "orchestration" is the turn time minus generation
+    and search, i.e. what jarvis_logic itself costs (a lower bound when the
+    speculative auto-search overlaps with generation).
+    """
+    replies = {prompt: (first, followup) for prompt, first, followup in PIPELINE_CORPUS}
+    stub = StubOllama(replies, tokens_per_second, latency)
+    timer = StageTimer()
+    stage_names = [stage for stage, _ in PIPELINE_STAGES] + ["orchestration", "turn"]
+    samples = {stage: [] for stage in stage_names}
+
+    print(f"\naskAI pipeline ({len(PIPELINE_CORPUS)} prompts x {rounds} rounds, "
+          f"{tokens_per_second:g} tok/s, {latency * 1000:g} ms model latency, {search_latency * 1000:g} ms search, "
+          f"{'native tool calls' if native_tools else 'text protocol'})")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory(prefix="jarvis-bench-") as tmp:
+        undo = patch_pipeline(Path(tmp), stub, make_stub_ddgs(search_latency), timer, fast_path, native_tools)
+        try:
+            for round_index in range(rounds):
+                session_id = f"bench-{round_index}"
+                for prompt, _, _ in PIPELINE_CORPUS:
+                    if not search_cache:
+                        jarvis_logic.search_cache.clear()
+                    timer.current = {}
+                    start = time.perf_counter()
+                    jarvis_logic.askAI(prompt, session_id=session_id)
+                    turn = time.perf_counter() - start
+                    for stage, _ in PIPELINE_STAGES:
+                        if stage in timer.current:
+                            samples[stage].append(timer.current[stage])
+                    samples["turn"].append(turn)
+                    samples["orchestration"].append(
+                        max(turn - timer.current.get("generation", 0.0) - timer.current.get("search", 0.0), 0.0)
+                    )
+        finally:
+            undo()
+
+    results = {stage: summarize(values) for stage, values in samples.items()}
+    print(f"{'stage':>18} {'n':>5} {'mean':>10} {'p50':>10} {'p95':>10} {'p99':>10}  (ms)")
+    for stage in stage_names:
+        r = results[stage]
+        print(f"{stage:>18} {r['n']:>5} {r['mean_ms']:>10.3f} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['p99_ms']:>10.3f}")
+    return {
+        "settings": {
+            "rounds": rounds,
+            "prompts": len(PIPELINE_CORPUS),
+            "tokens_per_second": tokens_per_second,
+            "latency": latency,
+            "search_latency": search_latency,
+            "search_cache": search_cache,
+            "fast_path": fast_path,
+            "native_tools": native_tools
+        },
+        "stages": results
+    }
+
+# ------------------ Entry Point ------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JARVIS offline benchmarks")
+    parser.add_argument("suite", nargs="?", default="triggers", choices=["triggers", "pipeline", "all"])
+    parser.add_argument("--iterations", type=int, default=2000, help="trigger suite iterations")
+    parser.add_argument("--rounds", type=int, default=5, help="pipeline suite: corpus replays")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="stub model token rate")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub model time to first token (s)")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="stub DuckDuckGo latency (s)")
+    parser.add_argument("--search-cache", action="store_true", help="keep search results cached between turns")
+    parser.add_argument("--fast-path", action="store_true", help="let the zero-LLM fast path answer tool prompts")
+    parser.add_argument("--text-protocol", action="store_true", help="TOOL()/SEARCH() text markers instead of native tool calls")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    if args.suite in ("triggers", "all"):
+        results["triggers"] = bench_triggers(args.iterations)
+    if args.suite in ("pipeline", "all"):
+        results["pipeline"] = bench_pipeline(
+            args.rounds, args.tokens_per_second, args.latency, args.search_latency, args.search_cache,
+            args.fast_path, not args.text_protocol
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Results written to {args.json}")
@@ -0,0 +1,253 @@
+# jarvis_cache.py
+# Small in-process caches used by jarvis_logic (TTL + LRU, semantic, optional JSON persistence)
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# ------------------ NumPy Import (optional, semantic cache) ------------------
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    np = None
+
+# ------------------ Bounded Dict ------------------
+class LRUDict(OrderedDict):
+    """Dict of at most `max_entries` keys; setting a key makes it the newest, the oldest is dropped"""
+
+    def __init__(self, max_entries=1024):
+        super().__init__()
+        self.max_entries = max_entries
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_entries:
+            self.popitem(last=False)
+
+# ------------------ TTL + LRU Cache ------------------
+class TTLCache:
+    """
+    Thread-safe key -> value cache with a per-entry TTL and LRU eviction.
+    If `path` is given the entries are persisted as JSON, so values must
+    be JSON serializable.
+    """
+
+    def __init__(self, max_entries=256, path=None):
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.path:
+            self.load()
+
+    def get(self, key):
+        """Return the cached value or None (expired entries count as misses)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl):
+        """Store a value for `ttl` seconds, evicting least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        if self.path:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            self.save()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    # ------------------ Persistence ------------------
+    def load(self):
+        """Load non-expired entries from disk (oldest first, so LRU order survives)"""
+        try:
+            if not self.path.exists():
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            now = time.time()
+            with self._lock:
+                for key, expires_at, value in stored:
+                    if expires_at > now:
+                        self._entries[key] = (expires_at, value)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        except Exception as e:
+            print(f"⚠ Cache load error ({self.path.name}): {e}")
+
+    def save(self):
+        """Write entries to disk atomically"""
+        try:
+            with self._lock:
+                stored = [[key, expires_at, value] for key, (expires_at, value) in self._entries.items()]
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with self._save_lock:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(stored, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠ Cache save error ({self.path.name}): {e}")
+
+# ------------------ Semantic Cache ------------------
+class SemanticCache:
+    """
+    Prompt embedding -> answer cache with cosine top-1 lookup.
+    Vectors are kept L2-normalized in one preallocated NumPy matrix, so a
+    lookup is a single matrix-vector product. When full, the least recently
+    used row is overwritten. Entries of another model or scope (session)
+    never match.
+    """
+
+    def __init__(self, max_entries=512, threshold=0.95, path=None):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("SemanticCache needs NumPy (pip install numpy)")
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.path = Path(path) if path else None
+        self._matrix = None   # (max_entries, dim) float32, allocated on first put
+        self._entries = []    # row -> {"prompt", "answer", "model", "scope"} or None
+        self._last_used = np.zeros(max_entries)  # row -> time of last put/hit
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.path:
+            self.load()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, vector, model=None, scope=None):
+        """Return (answer, similarity) of the best entry above the threshold, or (None, best similarity)"""
+        query = self._normalize(vector)
+        with self._lock:
+            if self._matrix is None or not self._entries or query.shape[0] != self._matrix.shape[1]:
+                self.misses += 1
+                return None, 0.0
+            scores = self._matrix[:len(self._entries)] @ query
+            for row, entry in enumerate(self._entries):
+                if entry is None or entry.get("scope") != scope or (model is not None and entry["model"] != model):
+                    scores[row] = -1.0
+            row = int(np.argmax(scores))
+            similarity = float(scores[row])
+            if similarity >= self.threshold and self._entries[row] is not None:
+                self._last_used[row] = time.time()
+                self.hits += 1
+                return self._entries[row]["answer"], similarity
+            self.misses += 1
+            return None, similarity
+
+    def put(self, vector, prompt, answer, model=None, scope=None):
+        """Store an answer, overwriting the least recently used row when full"""
+        self._insert(vector, prompt, answer, model, scope, time.time())
+        if self.path:
+            self.save()
+
+    def _insert(self, vector, prompt, answer, model, scope, last_used):
+        vector = self._normalize(vector)
+        with self._lock:
+            if self._matrix is None or vector.shape[0] != self._matrix.shape[1]:
+                # First entry, or the embedding model changed dimension
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._entries = []
+            if len(self._entries) < self.max_entries:
+                row = len(self._entries)
+                self._entries.append(None)
+            else:
+                row = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._matrix[row] = vector
+            self._entries[row] = {"prompt": prompt, "answer": answer, "model": model, "scope": scope}
+            self._last_used[row] = last_used
+
+    def clear(self):
+        with self._lock:
+            self._matrix = None
+            self._entries = []
+            self._last_used[:] = 0
+        if self.path:
+            self.save()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    # ------------------ Persistence ------------------
+    def load(self):
+        """Load entries and vectors from disk (most recently used rows survive)"""
+        try:
+            if not self.path.exists():
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            stored.sort(key=lambda item: item["last_used"])
+            for item in stored[-self.max_entries:]:
+                self._insert(
+                    item["vector"], item["prompt"], item["answer"], item.get("model"), item.get("scope"), item["last_used"]
+                )
+        except Exception as e:
+            print(f"⚠ Cache load error ({self.path.name}): {e}")
+
+    def save(self):
+        """Write entries and vectors to disk atomically"""
+        try:
+            with self._lock:
+                stored = [
+                    {**entry, "vector": self._matrix[row].tolist(), "last_used": float(self._last_used[row])}
+                    for row, entry in enumerate(self._entries) if entry is not None
+                ]
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with self._save_lock:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(stored, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠ Cache save error ({self.path.name}): {e}")
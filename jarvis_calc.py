@@ -0,0 +1,269 @@
+# jarvis_calc.py
+# Bounded AST-based calculator for TOOL("calculate") - no eval, bounded time and size
+import ast
+import functools
+import math
+import operator
+import time
+
+# ------------------ NumPy Import (optional, vector mode) ------------------
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    np = None
+
+# ------------------ Limits ------------------
+MAX_EXPRESSION_LENGTH = 500   # Characters
+MAX_NODES = 200               # AST nodes in one expression
+MAX_INT_BITS = 4096           # Integer operands/results (~1233 decimal digits)
+MAX_EXPONENT = 10000          # |b| in a ** b
+MAX_FACTORIAL = 500
+MAX_VECTOR_LENGTH = 10000     # Elements in a list input
+CALC_TIMEOUT = 0.5            # Seconds of wall-clock time per evaluation
+
+class CalcError(Exception):
+    """Invalid, unsafe or too expensive expression"""
+
+# ------------------ Checked Operations ------------------
+def check_value(value):
+    """Reject results outside the configured limits"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        if value.bit_length() > MAX_INT_BITS:
+            raise CalcError("Result too large")
+        return value
+    if isinstance(value, complex):
+        raise CalcError("Result is not a real number")
+    if isinstance(value, float):
+        # float overflow (1e308*10, exp(1000) in numpy) gives inf, inf-inf gives nan
+        if math.isnan(value):
+            raise CalcError("Math error: result is not a number")
+        if math.isinf(value):
+            raise CalcError("Result too large")
+    if NUMPY_AVAILABLE and isinstance(value, (np.ndarray, np.generic)):
+        if np.iscomplexobj(value):
+            raise CalcError("Result is not a real number")
+        if value.size > MAX_VECTOR_LENGTH:
+            raise CalcError("Vector too long")
+        if np.issubdtype(value.dtype, np.floating):
+            if np.isnan(value).any():
+                raise CalcError("Math error: result is not a number")
+            if np.isinf(value).any():
+                raise CalcError("Result too large")
+    return value
+
+def checked_mul(a, b):
+    if isinstance(a, int) and isinstance(b, int) and a.bit_length() + b.bit_length() > MAX_INT_BITS:
+        raise CalcError("Result too large")
+    return a * b
+
+def checked_pow(a, b):
+    if NUMPY_AVAILABLE and isinstance(b, np.ndarray):
+        if b.size and np.max(np.abs(b)) > MAX_EXPONENT:
+            raise CalcError("Exponent too large")
+    elif abs(b) > MAX_EXPONENT:
+        raise CalcError("Exponent too large")
+    if isinstance(a, int) and isinstance(b, int) and b > 0 and abs(a) > 1:
+        # Lower bound of the result size, check_value catches the rest
+        if (a.bit_length() - 1) * b + 1 > MAX_INT_BITS:
+            raise CalcError("Result too large")
+    return a ** b
+
+def checked_factorial(n):
+    if n != int(n) or n < 0:
+        raise CalcError("factorial() needs a non-negative integer")
+    if n > MAX_FACTORIAL:
+        raise CalcError(f"factorial() is limited to n <= {MAX_FACTORIAL}")
+    return math.factorial(int(n))
+
+def log_any(x, base=None):
+    return math.log(x) if base is None else math.log(x, base)
+
+def vector_log(x, base=None):
+    return np.log(x) if base is None else np.log(x) / np.log(base)
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: checked_mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: checked_pow,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+}
+
+# name -> (scalar function, vector function or None)
+FUNCTIONS = {
+    "sqrt": (math.sqrt, "sqrt"),
+    "exp": (math.exp, "exp"),
+    "log": (log_any, vector_log),
+    "ln": (math.log, "log"),
+    "log10": (math.log10, "log10"),
+    "log2": (math.log2, "log2"),
+    "sin": (math.sin, "sin"),
+    "cos": (math.cos, "cos"),
+    "tan": (math.tan, "tan"),
+    "asin": (math.asin, "arcsin"),
+    "acos": (math.acos, "arccos"),
+    "atan": (math.atan, "arctan"),
+    "atan2": (math.atan2, "arctan2"),
+    "sinh": (math.sinh, "sinh"),
+    "cosh": (math.cosh, "cosh"),
+    "tanh": (math.tanh, "tanh"),
+    "degrees": (math.degrees, "degrees"),
+    "radians": (math.radians, "radians"),
+    "hypot": (math.hypot, "hypot"),
+    "floor": (math.floor, "floor"),
+    "ceil": (math.ceil, "ceil"),
+    "abs": (abs, "abs"),
+    "round": (round, "round"),
+    "factorial": (checked_factorial, None),
+    "min": (min, "min"),
+    "max": (max, "max"),
+    "sum": (None, "sum"),
+    "mean": (None, "mean"),
+}
+
+# ------------------ Compiler ------------------
+def normalize_expression(expression):
+    """Accept common calculator notation (^ for power, × and ÷)"""
+    return expression.strip().replace("^", "**").replace("×", "*").replace("÷", "/")
+
+def compile_node(node, vector):
+    """Turn a validated AST node into a closure taking the deadline"""
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise CalcError(f"Unsupported constant: {value!r}")
+        check_value(value)
+        return lambda deadline: value
+
+    if isinstance(node, ast.Name):
+        if node.id not in CONSTANTS:
+            raise CalcError(f"Unknown name: {node.id}")
+        value = CONSTANTS[node.id]
+        return lambda deadline: value
+
+    if isinstance(node, (ast.List, ast.Tuple)):
+        if not vector:
+            raise CalcError("Lists need NumPy (pip install numpy)")
+        items = [compile_node(item, vector) for item in node.elts]
+        if len(items) > MAX_VECTOR_LENGTH:
+            raise CalcError("Vector too long")
+
+        def build_vector(deadline):
+            return np.array([item(deadline) for item in items], dtype=float)
+        return build_vector
+
+    if isinstance(node, ast.BinOp):
+        op = BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise CalcError(f"Unsupported operator: {type(node.op).__name__}")
+        left = compile_node(node.left, vector)
+        right = compile_node(node.right, vector)
+
+        def binary(deadline):
+            a = left(deadline)
+            b = right(deadline)
+            if time.perf_counter() > deadline:
+                raise CalcError("Calculation timed out")
+            return check_value(op(a, b))
+        return binary
+
+    if isinstance(node, ast.UnaryOp):
+        op = UNARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise CalcError(f"Unsupported operator: {type(node.op).__name__}")
+        operand = compile_node(node.operand, vector)
+        return lambda deadline: op(operand(deadline))
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise CalcError("Unsupported function call")
+        scalar_func, vector_func = FUNCTIONS[node.func.id]
+        if vector:
+            if vector_func is None:
+                raise CalcError(f"{node.func.id}() does not support lists")
+            func = getattr(np, vector_func) if isinstance(vector_func, str) else vector_func
+        else:
+            if scalar_func is None:
+                raise CalcError(f"{node.func.id}() needs a list")
+            func = scalar_func
+        args = [compile_node(arg, vector) for arg in node.args]
+
+        def call(deadline):
+            values = [arg(deadline) for arg in args]
+            if time.perf_counter() > deadline:
+                raise CalcError("Calculation timed out")
+            return check_value(func(*values))
+        return call
+
+    raise CalcError(f"Unsupported syntax: {type(node).__name__}")
+
+@functools.lru_cache(maxsize=512)
+def compile_expression(expression):
+    """Parse, validate and compile an expression (cached by expression text)"""
+    expression = normalize_expression(expression)
+    if not expression:
+        raise CalcError("No expression provided")
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalcError("Expression too long")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        raise CalcError("Invalid calculation")
+
+    nodes = list(ast.walk(tree))
+    if len(nodes) > MAX_NODES:
+        raise CalcError("Expression too complex")
+    vector = any(isinstance(n, (ast.List, ast.Tuple)) for n in nodes)
+    if vector and not NUMPY_AVAILABLE:
+        raise CalcError("Lists need NumPy (pip install numpy)")
+    return compile_node(tree.body, vector)
+
+# ------------------ Public API ------------------
+def format_result(value):
+    """Human readable result: ints exact, floats with 12 significant digits"""
+    if NUMPY_AVAILABLE and isinstance(value, np.ndarray):
+        return "[" + ", ".join(format_result(v) for v in value.tolist()) + "]"
+    if NUMPY_AVAILABLE and isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.12g}"
+    return str(value)
+
+def evaluate(expression, timeout=CALC_TIMEOUT):
+    """
+    Evaluate a math expression within the size and time limits
+    Returns the formatted result, raises CalcError
+    """
+    func = compile_expression(expression)
+    deadline = time.perf_counter() + timeout
+    try:
+        if NUMPY_AVAILABLE:
+            # Domain errors in vector mode become nan (rejected by check_value) instead of warnings
+            with np.errstate(all="ignore"):
+                return format_result(func(deadline))
+        return format_result(func(deadline))
+    except CalcError:
+        raise
+    except ZeroDivisionError:
+        raise CalcError("Division by zero")
+    except (ArithmeticError, ValueError, TypeError) as e:
+        raise CalcError(f"Math error: {e}")
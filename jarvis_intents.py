@@ -0,0 +1,136 @@
+# jarvis_intents.py
+# Zero-LLM fast path: deterministic intents (time, date, day, arithmetic, identity) in English and Hungarian
+import re
+
+from jarvis_calc import CONSTANTS, FUNCTIONS
+from jarvis_tools import execute_system_tool
+
+# ------------------ Intent Patterns ------------------
+# Matched against the whole normalized message, so "what time does the match
+# start" or "mennyi az idő Tokióban" still go to the model.
+PREFIX_PATTERN = re.compile(r'^(?:(?:hey|hi|ok|okay|szia|hé)\s+)?jarvis\s*,?\s*')
+SUFFIX_PATTERN = re.compile(r'\s*,?\s*(?:please|pls|kérlek|légyszi|jarvis)$')
+
+INTENT_PATTERNS = [
+    # (intent, language, pattern)
+    ("time", "en", r"(?:what(?:'s| is)? the (?:current )?time(?: now| right now)?|what time is it(?: now| right now)?|"
+                   r"(?:tell me )?the (?:current )?time|current time|time)"),
+    ("date", "en", r"(?:what(?:'s| is)? (?:the date|today's date)(?: today)?|what date is it(?: today)?|"
+                   r"today's date|(?:the )?date today|(?:current )?date)"),
+    ("day", "en", r"(?:what day is (?:it|today)(?: today)?|what day of the week is (?:it|today)|which day is (?:it|today))"),
+    ("identity", "en", r"(?:who are you|what are you|what(?:'s| is) your name|introduce yourself)"),
+    ("calculate", "en", r"(?:what(?:'s| is)|how much is|calculate|compute)\s+(?P<expr>.+)"),
+    ("time", "hu", r"(?:hány óra van(?: most)?|mennyi az idő(?: most)?|mennyi az óra|pontos idő)"),
+    ("date", "hu", r"(?:hányadika van(?: ma)?|(?:mi|mennyi) a (?:mai )?dátum|milyen dátum van(?: ma)?|mai dátum)"),
+    ("day", "hu", r"(?:milyen nap van(?: ma)?|(?:a hét )?melyik napja van(?: ma)?|ma milyen nap van)"),
+    ("identity", "hu", r"(?:ki vagy(?: te)?|mi a neved|hogy hívnak|mutatkozz be)"),
+    ("calculate", "hu", r"(?:mennyi(?: az?)?|számold ki|számítsd ki)\s+(?P<expr>.+)"),
+    ("calculate", None, r"(?P<expr>[\d(.][\d\s.+\-*/^()%×÷x]*)"),   # Bare "15*23"
+]
+INTENT_PATTERNS = [(intent, lang, re.compile(pattern)) for intent, lang, pattern in INTENT_PATTERNS]
+
+# An expression is only taken when every word is a calculator function/constant.
+# No commas: "1,000 + 2" would be a tuple, i.e. vector mode in jarvis_calc
+EXPRESSION_PATTERN = re.compile(r'[\w\s.+\-*/^()%×÷]+')
+OPERATOR_PATTERN = re.compile(r'[+\-*/^%×÷]|\w\s*\(')
+TIMES_PATTERN = re.compile(r'(?<=[\d)])\s*x\s*(?=[\d(])')
+# Bare digit groups that are dates, phone numbers or IDs, not arithmetic:
+# "2024-10-16", "555-1234", "16/10/2024", "16.10.2024"
+DIGIT_GROUPS_PATTERN = re.compile(r'\d+(?:-\d+)+|\d+(?:\s*[/.]\s*\d+){2,}')
+CALC_WORDS = set(FUNCTIONS) | set(CONSTANTS)
+
+# ------------------ Answer Templates ------------------
+HU_DAYS = {
+    "Monday": "hétfő", "Tuesday": "kedd", "Wednesday": "szerda", "Thursday": "csütörtök",
+    "Friday": "péntek", "Saturday": "szombat", "Sunday": "vasárnap"
+}
+
+TEMPLATES = {
+    ("time", "en"): "It's {hm}.",
+    ("time", "hu"): "{hm} van.",
+    ("date", "en"): "Today is {weekday}, {date}.",
+    ("date", "hu"): "Ma {date}, {weekday_hu} van.",
+    ("day", "en"): "It's {weekday}.",
+    ("day", "hu"): "Ma {weekday_hu} van.",
+    ("calculate", "en"): "{expr} = {result}",
+    ("calculate", "hu"): "{expr} = {result}",
+    ("identity", "en"): "I'm JARVIS, your AI assistant. How can I help?",
+    ("identity", "hu"): "JARVIS vagyok, a személyi asszisztensed. Miben segíthetek?",
+}
+
+# Intent -> tools whose results fill the template
+INTENT_TOOLS = {
+    "time": ("time",),
+    "date": ("date", "day"),
+    "day": ("day",),
+    "identity": (),
+}
+
+# ------------------ Matching ------------------
+def normalize(text):
+    """Lowercase, collapse spaces, drop the wake word, "please" and closing punctuation"""
+    text = " ".join(text.lower().split()).rstrip("?!. ")
+    text = SUFFIX_PATTERN.sub("", PREFIX_PATTERN.sub("", text))
+    return text.rstrip("?!. ")
+
+def calc_expression(candidate):
+    """Cleaned math expression, or None if the text is not (only) arithmetic"""
+    candidate = TIMES_PATTERN.sub("*", candidate.strip())
+    if not EXPRESSION_PATTERN.fullmatch(candidate) or not OPERATOR_PATTERN.search(candidate):
+        return None
+    if not re.search(r'\d', candidate):
+        return None
+    if any(word not in CALC_WORDS for word in re.findall(r'[a-z_]+', candidate)):
+        return None
+    return candidate
+
+def match_intent(user_input):
+    """
+    Deterministic intent of the whole message
+    Returns (intent, language, expression or None) or None
+    """
+    text = normalize(user_input)
+    if not text:
+        return None
+    for intent, lang, pattern in INTENT_PATTERNS:
+        match = pattern.fullmatch(text)
+        if not match:
+            continue
+        if intent != "calculate":
+            return (intent, lang, None)
+        if lang is None and DIGIT_GROUPS_PATTERN.fullmatch(match.group("expr").strip()):
+            continue
+        expression = calc_expression(match.group("expr"))
+        if expression:
+            # Bare expressions answer in English unless the text says otherwise
+            return (intent, lang or "en", expression)
+    return None
+
+def answer_intent(user_input):
+    """
+    Answer time/date/day/arithmetic/identity questions from the system tools
+    Returns (answer, intent) or None when the model is needed
+    """
+    found = match_intent(user_input)
+    if found is None:
+        return None
+    intent, lang, expression = found
+
+    values = {}
+    if intent == "calculate":
+        success, result = execute_system_tool("calculate", expression)
+        if not success or result.startswith("["):
+            return None  # Let the model explain the error (or the vector result)
+        values = {"expr": expression, "result": result}
+    else:
+        for tool_name in INTENT_TOOLS[intent]:
+            success, result = execute_system_tool(tool_name)
+            if not success:
+                return None
+            values[tool_name] = result
+        if "time" in values:
+            values["hm"] = values["time"][:5]
+        if "day" in values:
+            values["weekday"] = values["day"]
+            values["weekday_hu"] = HU_DAYS.get(values["day"], values["day"])
+    return TEMPLATES[(intent, lang)].format(**values), intent
@@ -0,0 +1,202 @@
+# jarvis_journal.py
+# Append-only JSON-lines interaction journal with a background writer and rotation
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ------------------ Configuration ------------------
+MAX_FILE_BYTES = 5 * 1024 * 1024   # Rotate the active file above this size
+MAX_FILE_AGE = 24 * 3600           # ... or when it is older than this (seconds)
+MAX_ROTATED_FILES = 20             # Rotated files kept on disk
+FSYNC_INTERVAL = 1.0               # Seconds between fsyncs while entries arrive
+MAX_BATCH = 256                    # Entries written per wake-up
+READ_BLOCK = 64 * 1024             # Bytes read per step when scanning backwards
+
+# ------------------ Interaction Journal ------------------
+class InteractionJournal:
+    """
+    log() only puts the entry on a queue; a daemon thread appends the
+    entries as JSON lines, fsyncs at most every FSYNC_INTERVAL seconds and
+    rotates the file by size and age. Rotated files are named
+    <stem>-YYYYmmdd-HHMMSS.jsonl next to the active file.
+    """
+
+    def __init__(self, path, max_bytes=MAX_FILE_BYTES, max_age=MAX_FILE_AGE, max_files=MAX_ROTATED_FILES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_files = max_files
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._opened_at = 0.0
+        self._last_fsync = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()  # Guards the file against rotate/read races
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+
+    # ------------------ Writer ------------------
+    def log(self, entry):
+        """Queue an entry (dict) for writing, never blocks on disk"""
+        if self._thread is None:
+            self.start()
+        self._queue.put(entry)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="jarvis-journal")
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        try:
+            # Age counts from the first entry in the file
+            with open(self.path, "r", encoding="utf-8") as f:
+                first = f.readline()
+            self._opened_at = json.loads(first)["_ts"] if first else time.time()
+        except Exception:
+            self._opened_at = time.time()
+
+    def _run(self):
+        while True:
+            timeout = FSYNC_INTERVAL if self._dirty else None
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            flushes = [entry["_flush"] for entry in batch if entry is not None and "_flush" in entry]
+            entries = [entry for entry in batch if entry is not None and "_flush" not in entry]
+            with self._lock:
+                try:
+                    self._write(entries)
+                    if self._dirty and (stop or flushes or time.time() - self._last_fsync >= FSYNC_INTERVAL):
+                        self._sync()
+                except Exception as e:
+                    self.dropped += len(entries)
+                    print(f"⚠ Journal write error: {e}")
+            for done in flushes:
+                done.set()
+            if stop:
+                return
+
+    def _write(self, entries):
+        if not entries:
+            return
+        if self._file is None:
+            self._open()
+        now = time.time()
+        lines = [json.dumps({"_ts": now, **entry}, ensure_ascii=False) + "\n" for entry in entries]
+        self._file.write("".join(lines))
+        self._file.flush()
+        self._dirty = True
+        self.written += len(entries)
+        if self._file.tell() >= self.max_bytes or now - self._opened_at >= self.max_age:
+            self._rotate()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self._last_fsync = time.time()
+
+    def _rotate(self):
+        """Close the active file under a timestamped name and drop the oldest ones"""
+        self._sync()
+        self._file.close()
+        self._file = None
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = self.path.with_name(f"{self.path.stem}-{stamp}{self.path.suffix}")
+        counter = 1
+        while target.exists():
+            target = self.path.with_name(f"{self.path.stem}-{stamp}-{counter}{self.path.suffix}")
+            counter += 1
+        os.replace(self.path, target)
+        for old in self.rotated_files()[self.max_files:]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is on disk"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put({"_flush": done})
+        done.wait(timeout)
+
+    def close(self):
+        """Write the remaining entries, fsync and stop the writer"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ------------------ Reader ------------------
+    def rotated_files(self):
+        """Rotated journal files, newest first"""
+        return sorted(self.path.parent.glob(f"{self.path.stem}-*{self.path.suffix}"), reverse=True)
+
+    def iter_recent(self, limit=None):
+        """
+        Yield entries newest first, reading files backwards block by block,
+        so only the requested tail is loaded
+        """
+        count = 0
+        for path in [self.path] + self.rotated_files():
+            for line in self._reverse_lines(path):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partially written last line
+                yield entry
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+    def recent(self, limit=100):
+        """The last `limit` entries, oldest first"""
+        return list(self.iter_recent(limit))[::-1]
+
+    def _reverse_lines(self, path):
+        try:
+            with self._lock:
+                if path == self.path and self._file is not None:
+                    self._file.flush()
+            with open(path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                position = f.tell()
+                remainder = b""
+                while position > 0:
+                    step = min(READ_BLOCK, position)
+                    position -= step
+                    f.seek(position)
+                    lines = (f.read(step) + remainder).split(b"\n")
+                    remainder = lines.pop(0)
+                    for line in reversed(lines):
+                        if line.strip():
+                            yield line.decode("utf-8", errors="replace")
+                if remainder.strip():
+                    yield remainder.decode("utf-8", errors="replace")
+        except FileNotFoundError:
+            return
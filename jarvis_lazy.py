@@ -0,0 +1,191 @@
+# jarvis_lazy.py
+# Lazy subsystem imports, background prewarming and startup import profiling
+import builtins
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+# ------------------ psutil Import (optional, RSS on every platform) ------------------
+PSUTIL_AVAILABLE = False
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except Exception:
+    psutil = None
+
+# ------------------ Memory ------------------
+def rss_bytes():
+    """Resident set size of this process in bytes (None if it can't be read)"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def format_mb(value):
+    return f"{value / 1048576:8.1f}" if value is not None else "     n/a"
+
+# ------------------ Lazy Modules ------------------
+def dependencies_present(*names):
+    """True if every package can be imported (checked without importing it)"""
+    try:
+        return all(importlib.util.find_spec(name) is not None for name in names)
+    except (ImportError, ValueError):
+        return False
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access (or by
+    load()/prewarm), so heavy dependencies stay off the startup path.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+        self.load_time = None   # Seconds the import took
+        self.rss_delta = None   # Bytes the import added
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        module = self._module
+        if module is not None:
+            return module
+        with self._lock:
+            if self._module is None:
+                rss_before = rss_bytes()
+                start = time.perf_counter()
+                module = importlib.import_module(self._name)
+                self.load_time = time.perf_counter() - start
+                rss_after = rss_bytes()
+                if rss_before is not None and rss_after is not None:
+                    self.rss_delta = rss_after - rss_before
+                print(f"📦 {self._name} loaded ({self.load_time:.2f}s)")
+                self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        # Only called for attributes LazyModule itself doesn't have
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<LazyModule {self._name} ({'loaded' if self.loaded else 'not loaded'})>"
+
+_lazy_modules = {}
+
+def lazy_module(name):
+    """Shared LazyModule for a module name"""
+    module = _lazy_modules.get(name)
+    if module is None:
+        module = _lazy_modules.setdefault(name, LazyModule(name))
+    return module
+
+def prewarm(*steps):
+    """
+    Load modules / run callables one after another in a daemon thread.
+    Steps are LazyModules (loaded) or callables (called); errors are printed
+    and the remaining steps still run.
+    """
+    def run():
+        for step in steps:
+            try:
+                if isinstance(step, LazyModule):
+                    step.load()
+                else:
+                    step()
+            except Exception as e:
+                print(f"⚠ Prewarm step failed ({step!r}): {e}")
+
+    thread = threading.Thread(target=run, daemon=True, name="jarvis-prewarm")
+    thread.start()
+    return thread
+
+# ------------------ Startup Profiling ------------------
+class ImportProfiler:
+    """
+    Records every package imported while active: inclusive wall time and RSS
+    growth, attributed to the first import of its top-level package.
+    """
+
+    def __init__(self):
+        self.records = []   # (package, depth, seconds, rss delta)
+        self._depth = 0
+        self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        root = name.partition(".")[0]
+        if level or not root or root in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        depth = self._depth
+        self._depth += 1
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            rss_after = rss_bytes()
+            delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            self._depth -= 1
+            self.records.append((root, depth, elapsed, delta))
+
+    def __enter__(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+
+def profile_startup(module_names, critical=(), top=15):
+    """
+    Import the given modules in order (in this process) and print per-module
+    import time and RSS growth, then the heaviest packages pulled in by them.
+    `critical` names the modules the main window waits for.
+    """
+    rows = []
+    base_rss = rss_bytes()
+    with ImportProfiler() as profiler:
+        for name in module_names:
+            start = time.perf_counter()
+            rss_before = rss_bytes()
+            try:
+                importlib.import_module(name)
+                status = "ok"
+            except Exception as e:
+                status = f"failed: {e}"
+            elapsed = time.perf_counter() - start
+            rss_after = rss_bytes()
+            delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            rows.append((name, elapsed, delta, status))
+
+    print("\n" + "=" * 72)
+    print("JARVIS startup profile (import time and RSS growth per subsystem)")
+    print("=" * 72)
+    print(f"{'module':<28}{'seconds':>9}{'RSS MB':>10}  status")
+    for name, elapsed, delta, status in rows:
+        marker = "*" if name in critical else " "
+        print(f"{marker}{name:<27}{elapsed:9.3f}{format_mb(delta):>10}  {status}")
+    critical_time = sum(elapsed for name, elapsed, _, _ in rows if name in critical)
+    print(f"\n* needed before the main window: {critical_time:.3f}s "
+          f"(total {sum(r[1] for r in rows):.3f}s)")
+
+    packages = sorted(
+        (record for record in profiler.records if not record[0].startswith("jarvis_")),
+        key=lambda record: record[2], reverse=True
+    )[:top]
+    if packages:
+        print("\nHeaviest packages (inclusive, first import):")
+        print(f"{'package':<28}{'seconds':>9}{'RSS MB':>10}  depth")
+        for package, depth, elapsed, delta in packages:
+            print(f" {package:<27}{elapsed:9.3f}{format_mb(delta):>10}  {depth}")
+    print(f"\nRSS: {format_mb(base_rss).strip()} MB -> {format_mb(rss_bytes()).strip()} MB")
+    return rows
@@ -1,12 +1,30 @@
 # jarvis_logic.py
 # Enhanced with Ollama, streaming, user-defined rules, and internet access
+import asyncio
+import functools
 import json
 import os
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 import re
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 
+import jarvis_metrics as metrics
+from jarvis_cache import NUMPY_AVAILABLE, LRUDict, SemanticCache, TTLCache
+from jarvis_intents import answer_intent
+from jarvis_journal import InteractionJournal
+from jarvis_memory import MemoryIndex
+from jarvis_rank import prune_search_results
+from jarvis_router import complexity_score, model_tiers, select_tier, validate_output
+from jarvis_scheduler import BACKGROUND, INTERACTIVE, TOOL_FOLLOWUP, CancelToken, OllamaScheduler
+from jarvis_storage import ConversationStore, DEFAULT_SESSION
+from jarvis_tools import execute_system_tool, get_tool_stats, tool_label, tool_list_text, tool_schemas
+
 # ------------------ Ollama Import ------------------
 OLLAMA_AVAILABLE = False
 try:
@@ -34,10 +52,36 @@ DATA_DIR.mkdir(exist_ok=True)
 
 CONFIG_FILE = DATA_DIR / "config.yaml"
 HISTORY_FILE = DATA_DIR / "chat_history.json"
-LOG_FILE = DATA_DIR / "logic_memory.json"
+JOURNAL_FILE = DATA_DIR / "logs" / "interactions.jsonl"
 CONTEXT_FILE = DATA_DIR / "conversation_context.json"
+DB_FILE = DATA_DIR / "jarvis.db"
+SEARCH_CACHE_FILE = DATA_DIR / "search_cache.json"
+SEMANTIC_CACHE_FILE = DATA_DIR / "semantic_cache.json"
+MEMORY_DIR = DATA_DIR / "memory"
 
 MAX_SEARCH_RETRIES = 3
+MAX_SEARCHES_PER_TURN = 4   # SEARCH() calls executed from one model turn
+MAX_PARALLEL_SEARCHES = 4   # Size of the search thread pool
+
+# ------------------ Search Cache Settings ------------------
+SEARCH_CACHE_SIZE = 256
+SEARCH_CACHE_DEFAULT_TTL = 6 * 3600  # General queries
+# Query keyword -> TTL in seconds (shortest matching TTL wins)
+SEARCH_CACHE_TTLS = {
+    'weather': 10 * 60,
+    'temperature': 10 * 60,
+    'stock': 2 * 60,
+    'price': 5 * 60,
+    'score': 2 * 60,
+    'match': 5 * 60,
+    'news': 30 * 60,
+    'latest': 30 * 60,
+    'today': 30 * 60,
+    'now': 10 * 60,
+}
+
+# ------------------ Semantic Cache Settings ------------------
+SEMANTIC_CACHE_SIZE = 512  # Stored answers, least recently used is replaced
 
 # ------------------ Default Configuration ------------------
 DEFAULT_CONFIG = {
@@ -56,16 +100,7 @@ SYSTEM TOOLS:
 You can use system tools by writing: TOOL("tool_name") or TOOL("tool_name", "args")
 
 Available tools:
-- TOOL("time") - Current time
-- TOOL("date") - Current date
-- TOOL("datetime") - Full date and time
-- TOOL("day") - Day of week
-- TOOL("year") - Current year
-- TOOL("month") - Current month name
-- TOOL("timestamp") - Unix timestamp
-- TOOL("calculate", "2+2*3") - Math calculations
-- TOOL("system") - Operating system info
-- TOOL("python_version") - Python version
+{TOOLS}
 
 Examples of CORRECT behavior:
 
@@ -115,7 +150,25 @@ CONVERSATION GUIDELINES:
 
 REMEMBER: You're an assistant, not a tutor. ACT, don't explain!""",
     "temperature": 0.7,
-    "max_tokens": 500
+    "max_tokens": 500,
+    "context_tokens": 4096,
+    "keep_alive": "30m",
+    "search_result_tokens": 600,
+    "semantic_cache": False,
+    "semantic_cache_threshold": 0.95,
+    "embedding_model": "nomic-embed-text",
+    "long_term_memory": False,
+    "memory_top_k": 3,
+    "memory_min_similarity": 0.5,
+    "metrics_port": 0,
+    "fast_path": True,
+    "native_tools": False,  # Opt-in: native_rules replace a customized "rules"
+    "native_rules": """You are JARVIS, Tony Stark's AI assistant. Be concise, helpful, and natural.
+Use the provided tools for the time, date and calculations, and web_search for anything current
+(weather, news, prices, results). Call tools directly, never explain how you would search.
+Answer in 2-3 conversational sentences unless more detail is needed, in the user's language (English/Hungarian).""",
+    "model_tiers": [],
+    "escalate_on_failure": True
 }
 
 # ------------------ Cache for config to avoid repeated disk reads ------------------
@@ -162,162 +215,699 @@ def save_config(config):
     except Exception as e:
         print(f"⚠ Config save error: {e}")
 
+# ------------------ Ollama Request Scheduler ------------------
+# Every Ollama call takes a slot: user turns first, background work waits
+ollama_scheduler = OllamaScheduler()
+
+def get_scheduler_stats():
+    """Queue depth, running calls and wait times per priority class"""
+    return ollama_scheduler.stats()
+
+# ------------------ Conversation Store ------------------
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Open the SQLite conversation store (imports the legacy JSON files once)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = ConversationStore(DB_FILE)
+                store.import_legacy_json(HISTORY_FILE, CONTEXT_FILE)
+                _store = store
+    return _store
+
+# Placeholder in the rules that is replaced by the generated tool list
+TOOLS_PLACEHOLDER = "{TOOLS}"
+
+def build_rules(config, native=False):
+    """
+    Configured rules with the tool list filled in from the tool registry.
+    With native tool calling the short native_rules are used instead: tools
+    are described by Ollama's `tools` parameter, not by the prompt.
+    """
+    if native:
+        return config.get("native_rules", DEFAULT_CONFIG["native_rules"])
+    rules = config.get("rules", DEFAULT_CONFIG["rules"])
+    return rules.replace(TOOLS_PLACEHOLDER, tool_list_text())
+
+def system_message(native=False):
+    """System message built from the configured rules"""
+    return {"role": "system", "content": build_rules(load_config(), native)}
+
 # ------------------ Chat History Management ------------------
-def load_history():
-    """Load chat history from JSON"""
-    if HISTORY_FILE.exists():
-        try:
-            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-                history = json.load(f)
-                # Ensure we have a system message
-                if not history or history[0].get("role") != "system":
-                    config = load_config()
-                    history.insert(0, {"role": "system", "content": config.get("rules", DEFAULT_CONFIG["rules"])})
-                return history
-        except Exception as e:
-            print(f"⚠ History load error: {e}")
-    
-    # Return default with system rules
-    config = load_config()
-    return [{"role": "system", "content": config.get("rules", DEFAULT_CONFIG["rules"])}]
+def load_history(session_id=DEFAULT_SESSION):
+    """Load system message + active history window of a session"""
+    try:
+        return [system_message()] + get_store().recent(session_id)
+    except Exception as e:
+        print(f"⚠ History load error: {e}")
+    return [system_message()]
+
+def append_history(messages, session_id=DEFAULT_SESSION):
+    """Append messages to a session's history (system messages are never stored)"""
+    try:
+        get_store().append(session_id, [m for m in messages if m.get("role") != "system"])
+    except Exception as e:
+        print(f"⚠ History save error: {e}")
+    schedule_memory_update()
 
-def save_history(history):
-    """Save chat history to JSON"""
+def save_history(history, session_id=DEFAULT_SESSION):
+    """Replace a session's stored history"""
     try:
-        # Keep only last 30 messages (plus system message)
-        if len(history) > 31:
-            history = [history[0]] + history[-30:]  # Keep system message + last 30
-        with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        get_store().replace(session_id, [m for m in history if m.get("role") != "system"])
     except Exception as e:
         print(f"⚠ History save error: {e}")
 
-def clear_history():
+def clear_history(session_id=DEFAULT_SESSION):
     """Clear chat history and start fresh"""
-    config = load_config()
-    history = [{"role": "system", "content": config.get("rules", DEFAULT_CONFIG["rules"])}]
-    save_history(history)
+    history_anchors.pop(session_id, None)
+    context_stats.pop(session_id, None)
+    try:
+        get_store().clear(session_id)
+    except Exception as e:
+        print(f"⚠ History clear error: {e}")
     print("✓ Chat history cleared")
-    return history
+    return [system_message()]
+
+# ------------------ Context Window ------------------
+CHARS_PER_TOKEN = 4           # Rough average for English/Hungarian text
+MESSAGE_TOKEN_OVERHEAD = 4    # Role/template tokens per message
+SEARCH_RESERVE_TOKENS = 1200  # Kept free for injected search/tool results
+SUMMARY_MAX_MESSAGES = 40     # Messages folded into the summary per update
+SUMMARY_MAX_CHARS = 600       # Per message in the summary prompt
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and JARVIS.
+Keep names, facts, preferences and open questions. Maximum 120 words, plain text.
+
+Current summary:
+{summary}
+
+New messages:
+{transcript}
+
+Updated summary:"""
+
+THINK_PATTERN = re.compile(r'<think>.*?</think>', re.DOTALL)
+
+HISTORY_REFILL_RATIO = 0.6   # Share of the history budget kept after a re-anchor
+
+# Per-session prompt state; the server creates a session per anonymous request,
+# so only the most recently used sessions are kept
+MAX_TRACKED_SESSIONS = 1024
+context_stats = LRUDict(MAX_TRACKED_SESSIONS)    # session -> token accounting of the last assembled prompt
+history_anchors = LRUDict(MAX_TRACKED_SESSIONS)  # session -> id of the first history message in the prompt
+summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jarvis-summary")
+_summaries_running = set()
+_summaries_lock = threading.Lock()
+
+def estimate_tokens(text):
+    """Cheap token estimate (no tokenizer needed)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def message_tokens(content):
+    return estimate_tokens(content) + MESSAGE_TOKEN_OVERHEAD
+
+def model_options(config):
+    """Ollama options shared by all chat calls"""
+    return {"num_ctx": config.get("context_tokens", DEFAULT_CONFIG["context_tokens"])}
+
+def model_keep_alive(config):
+    """How long Ollama keeps the model loaded after a request"""
+    return config.get("keep_alive", DEFAULT_CONFIG["keep_alive"])
+
+def assemble_history(session_id, user_input, config, memories=None, tools=None):
+    """
+    Build [system, settled history..., summary, memories, user] within the
+    token budget derived from the model's context size. System rules and
+    settled history form a byte-stable prefix across turns (so Ollama can
+    reuse its KV cache): the history start only moves when the budget
+    overflows, and then jumps forward by several turns at once. Older turns
+    are folded into the running summary in the background; the summary and
+    recalled memories ((turn_id, text) pairs) sit after the prefix.
+    Native tool definitions (tools) count towards the system prompt.
+    """
+    store = get_store()
+    system = system_message(bool(tools))
+    context_tokens = config.get("context_tokens", DEFAULT_CONFIG["context_tokens"])
+    reply_tokens = config.get("max_tokens", DEFAULT_CONFIG["max_tokens"])
+    system_tokens = message_tokens(system["content"])
+    if tools:
+        system_tokens += estimate_tokens(json.dumps(tools))
+    input_tokens = message_tokens(user_input)
+    budget = max(context_tokens - reply_tokens - SEARCH_RESERVE_TOKENS - system_tokens - input_tokens, 0)
+    
+    summary_upto, summary = store.get_summary(session_id)
+    summary_message = None
+    summary_tokens = 0
+    if summary:
+        summary_message = {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+        summary_tokens = message_tokens(summary_message["content"])
+    memory_tokens = sum(message_tokens(text) for _, text in memories or [])
+    history_budget = budget - summary_tokens - memory_tokens
+    
+    # Keep the history start (anchor) where it was while everything still fits
+    window = store.recent_with_ids(session_id)
+    anchor = history_anchors.get(session_id, 0)
+    selected = [m for m in window if m[0] >= anchor]
+    history_tokens = sum(message_tokens(content) for _, _, content in selected)
+    
+    if history_tokens > history_budget:
+        # Re-anchor: newest turns filling only part of the budget, so the
+        # new prefix stays stable for the next few turns
+        refill_budget = history_budget * HISTORY_REFILL_RATIO
+        selected = []
+        history_tokens = 0
+        for message_id, role, content in reversed(window):
+            tokens = message_tokens(content)
+            if history_tokens + tokens > refill_budget:
+                break
+            selected.append((message_id, role, content))
+            history_tokens += tokens
+        selected.reverse()
+    # Don't start with an answer whose question was dropped
+    while selected and selected[0][1] == "assistant":
+        history_tokens -= message_tokens(selected.pop(0)[2])
+    if selected:
+        history_anchors[session_id] = selected[0][0]
+    
+    dropped = len(selected) < len(window) or len(window) >= store.window
+    messages = [system]
+    messages += [{"role": role, "content": content} for _, role, content in selected]
+    if summary_message and dropped:
+        messages.append(summary_message)
+    else:
+        summary_tokens = 0
+    # Memories of turns that are still in the prompt add nothing
+    first_included = selected[0][0] if selected else None
+    memories = [(turn_id, text) for turn_id, text in memories or [] if first_included is None or turn_id < first_included]
+    memory_tokens = 0
+    if memories:
+        memory_message = {"role": "system", "content": "Relevant memories from earlier conversations:\n" + "\n".join(text for _, text in memories)}
+        memory_tokens = message_tokens(memory_message["content"])
+        messages.append(memory_message)
+    messages.append({"role": "user", "content": user_input})
+    
+    # Fold dropped messages into the summary off the hot path
+    if dropped and window:
+        last_dropped = (selected[0][0] if selected else window[-1][0] + 1) - 1
+        if last_dropped > summary_upto:
+            schedule_summary(session_id, last_dropped, config.get("model", "llama3.2"))
+    
+    total = system_tokens + summary_tokens + memory_tokens + history_tokens + input_tokens
+    context_stats[session_id] = {
+        "context_tokens": context_tokens,
+        "prompt_tokens": total,
+        "system_tokens": system_tokens,
+        "summary_tokens": summary_tokens,
+        "memory_tokens": memory_tokens,
+        "history_tokens": history_tokens,
+        "input_tokens": input_tokens,
+        "history_budget": history_budget,
+        "messages_included": len(selected),
+        "messages_dropped": len(window) - len(selected),
+        "memories_included": len(memories),
+        "summary_upto_id": summary_upto,
+        "prefix_anchor_id": history_anchors.get(session_id, 0)
+    }
+    print(f"🧮 Context: ~{total}/{context_tokens} tokens (system {system_tokens}, summary {summary_tokens}, "
+          f"memories {memory_tokens}, history {history_tokens}, input {input_tokens}), {len(selected)} messages")
+    return messages
+
+def get_context_stats(session_id=DEFAULT_SESSION):
+    """Token accounting of the last prompt assembled for a session"""
+    return dict(context_stats.get(session_id, {}))
+
+def schedule_summary(session_id, upto_id, model_name):
+    """Queue a background summary update (one at a time per session)"""
+    if not OLLAMA_AVAILABLE:
+        return
+    with _summaries_lock:
+        if session_id in _summaries_running:
+            return
+        _summaries_running.add(session_id)
+    summary_executor.submit(update_summary, session_id, upto_id, model_name)
+
+def update_summary(session_id, upto_id, model_name):
+    """Fold messages up to upto_id into the session's running summary"""
+    try:
+        store = get_store()
+        summary_upto, summary = store.get_summary(session_id)
+        rows = store.messages_between(session_id, summary_upto, upto_id, SUMMARY_MAX_MESSAGES)
+        if not rows:
+            return
+        transcript = "\n".join(
+            f"{role.upper()}: {content[:SUMMARY_MAX_CHARS]}" for _, role, content in rows
+        )
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(none)", transcript=transcript)
+        with ollama_scheduler.slot(BACKGROUND):
+            response = ollama.generate(model=model_name, prompt=prompt, keep_alive=model_keep_alive(load_config()))
+        new_summary = THINK_PATTERN.sub('', response["response"]).strip()
+        if new_summary:
+            store.set_summary(session_id, rows[-1][0], new_summary)
+            print(f"📝 Conversation summary updated ({len(rows)} messages folded in)")
+    except Exception as e:
+        print(f"⚠ Summary update error: {e}")
+    finally:
+        with _summaries_lock:
+            _summaries_running.discard(session_id)
+
+# ------------------ Model Lifecycle ------------------
+KEEP_ALIVE_REFRESH = 10 * 60  # Idle seconds before the model gets a keep-alive ping
+LIFECYCLE_CHECK_INTERVAL = 60
+
+class ModelLifecycle:
+    """
+    Preloads the configured model, prefills the system prompt into Ollama's
+    KV cache and keeps the model resident while the app is idle.
+    """
+
+    def __init__(self):
+        self.last_used = 0.0
+        self.warm_model = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def note_use(self):
+        """Called on every request, requests refresh keep_alive themselves"""
+        self.last_used = time.time()
+
+    def warm_up(self, config=None):
+        """Load every tier's model and prefill the system prompt (blocking)"""
+        config = config or load_config()
+        model_names = configured_models(config)
+        try:
+            for model_name in model_names:
+                start = time.perf_counter()
+                # Same system prompt (and tool definitions) as real turns, so the prefix is cached
+                tools = native_tools(config, [model_name])
+                request = {"tools": tools} if tools else {}
+                with ollama_scheduler.slot(BACKGROUND):
+                    ollama.chat(
+                        model=model_name,
+                        messages=[system_message(bool(tools))],
+                        options={**model_options(config), "num_predict": 1},
+                        keep_alive=model_keep_alive(config),
+                        **request
+                    )
+                print(f"🔥 Model {model_name} ready ({time.perf_counter() - start:.1f}s)")
+            self.warm_model = model_names
+            self.note_use()
+            return True
+        except Exception as e:
+            print(f"⚠ Model warm-up error: {e}")
+            return False
+
+    def start(self):
+        """Warm up in the background and keep the model resident"""
+        if not OLLAMA_AVAILABLE or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="jarvis-model-lifecycle")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self.warm_up()
+        while not self._stop.wait(LIFECYCLE_CHECK_INTERVAL):
+            config = load_config()
+            keep_alive = model_keep_alive(config)
+            if configured_models(config) != self.warm_model:
+                # Model (or tier list) changed in config.yaml
+                self.warm_up(config)
+            elif keep_alive not in (-1, "-1") and time.time() - self.last_used > KEEP_ALIVE_REFRESH:
+                self.warm_up(config)
+
+def configured_models(config):
+    """Distinct models of the routing tiers, in tier order"""
+    return list(dict.fromkeys(tier["model"] for tier in model_tiers(config)))
+
+model_lifecycle = ModelLifecycle()
+
+def start_model_lifecycle():
+    """Preload the configured model in the background (call once at startup)"""
+    model_lifecycle.start()
 
 # ------------------ Context Management ------------------
-def load_context():
+def load_context(session_id=DEFAULT_SESSION):
     """Load conversation context"""
+    default = {"user_name": None, "preferences": {}, "last_topics": []}
     try:
-        if CONTEXT_FILE.exists():
-            with open(CONTEXT_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except:
-        pass
-    return {"user_name": None, "preferences": {}, "last_topics": []}
-
-def save_context(context):
+        return get_store().get_context(session_id, default)
+    except Exception:
+        return default
+
+def save_context(context, session_id=DEFAULT_SESSION):
     """Save conversation context"""
     try:
-        with open(CONTEXT_FILE, "w", encoding="utf-8") as f:
-            json.dump(context, f, indent=2, ensure_ascii=False)
+        get_store().set_context(session_id, context)
     except Exception as e:
         print(f"Context save error: {e}")
 
+# ------------------ Search Cache ------------------
+search_cache = TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_FILE)
+search_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_SEARCHES, thread_name_prefix="jarvis-search")
+
+def normalize_query(query):
+    """Cache key for a search query: lowercase words without punctuation"""
+    return ' '.join(re.findall(r'\w+', query.lower()))
+
+def search_ttl(normalized_query):
+    """TTL for a normalized query, short for fast-changing data (weather, stocks...)"""
+    ttls = [SEARCH_CACHE_TTLS[w] for w in normalized_query.split() if w in SEARCH_CACHE_TTLS]
+    return min(ttls) if ttls else SEARCH_CACHE_DEFAULT_TTL
+
+def get_search_cache_stats():
+    """Hit/miss counters of the web search cache"""
+    return search_cache.stats()
+
 # ------------------ Web Search Function ------------------
-def web_search(query, retries=MAX_SEARCH_RETRIES):
-    """Search the web using DuckDuckGo with automatic retries"""
+def fetch_search_results(query, retries=MAX_SEARCH_RETRIES):
+    """
+    Search the web using DuckDuckGo with automatic retries (results are cached)
+    Returns a list of {"title", "body", "href"} dicts, or None on failure
+    """
+    cache_key = normalize_query(query)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        print(f"\n⚡ Cached search results for: {query}")
+        metrics.inc("jarvis_search_attempts_total", result="cached")
+        return cached
+    
     if not WEB_SEARCH_AVAILABLE:
         return None  # Return None to indicate failure
     
     print(f"\n🔎 Searching the web for: {query}")
-    results_text = ""
     
     for attempt in range(retries):
         try:
-            with DDGS() as ddgs:
-                results = list(ddgs.text(query, max_results=8))  # Get more results for better info
+            with metrics.span("search_attempt"):
+                with DDGS() as ddgs:
+                    results = list(ddgs.text(query, max_results=8))  # Get more results for better info
             
+            results = [r for r in results if r.get('title') or r.get('body')]
             if not results:
+                metrics.inc("jarvis_search_attempts_total", result="empty")
                 print(f"⚠️ No results found, retrying... ({attempt + 1}/{retries})")
                 continue
             
-            # Format results with more detail
-            for i, r in enumerate(results, 1):
-                results_text += f"\n[Source {i}] {r['title']}\n"
-                results_text += f"{r['body']}\n"
-                if 'href' in r:
-                    results_text += f"URL: {r['href']}\n"
-            
-            if results_text.strip():
-                print("✅ Found results.")
-                return results_text
+            metrics.inc("jarvis_search_attempts_total", result="ok")
+            print("✅ Found results.")
+            search_cache.put(cache_key, results, search_ttl(cache_key))
+            return results
                 
         except Exception as e:
+            metrics.inc("jarvis_search_attempts_total", result="error")
             print(f"⚠️ Search attempt {attempt + 1} failed: {e}")
     
     print("❌ No useful results found after retries.")
     return None  # Return None instead of error message
 
-# ------------------ System Tools/Modules ------------------
-def execute_system_tool(tool_name, args=None):
+def format_search_results(results, show_query=False, question=None):
     """
-    Execute system tools that JARVIS can use
-    Returns (success, result) tuple
+    Format search results as numbered source blocks for the prompt.
+    With a question, only the most relevant sentences (BM25) within the
+    configured search_result_tokens budget are kept.
     """
-    tool_name = tool_name.lower().strip()
-    
+    if question:
+        max_tokens = load_config().get("search_result_tokens", DEFAULT_CONFIG["search_result_tokens"])
+        pruned = prune_search_results(results, question, max_tokens, estimate_tokens)
+        if pruned:
+            before = sum(estimate_tokens(f"{r.get('title', '')} {r.get('body', '')} {r.get('href', '')}") for r in results)
+            after = sum(estimate_tokens(f"{r.get('title', '')} {r.get('body', '')} {r.get('href', '')}") for r in pruned)
+            print(f"✂️ Search results pruned: ~{before} -> ~{after} tokens ({len(pruned)}/{len(results)} sources)")
+            results = pruned
+    results_text = ""
+    for i, r in enumerate(results, 1):
+        query_note = f" (query: {r['query']})" if show_query and r.get('query') else ""
+        results_text += f"\n[Source {i}] {r.get('title', '')}{query_note}\n"
+        results_text += f"{r.get('body', '')}\n"
+        if r.get('href'):
+            results_text += f"URL: {r['href']}\n"
+    return results_text
+
+def web_search(query, retries=MAX_SEARCH_RETRIES, question=None):
+    """Search the web and return formatted results text, or None on failure"""
+    results = fetch_search_results(query, retries)
+    return format_search_results(results, question=question) if results else None
+
+def merge_search_results(results_per_query):
+    """Merge (query, results) pairs, dropping results whose URL was already seen"""
+    merged = []
+    seen_urls = set()
+    for query, results in results_per_query:
+        for r in results or []:
+            url = r.get('href')
+            if url:
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+            merged.append({**r, 'query': query})
+    return merged
+
+def unique_queries(queries):
+    """Drop duplicate queries (after normalization), keep order, cap per turn"""
+    unique = []
+    seen = set()
+    for query in queries:
+        key = normalize_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(query)
+    return unique[:MAX_SEARCHES_PER_TURN]
+
+def multi_search(queries, retries=MAX_SEARCH_RETRIES, question=None):
+    """
+    Run several searches in parallel on the search thread pool
+    Returns one merged results text (deduplicated by URL), or None on failure
+    """
+    queries = unique_queries(queries)
+    results_per_query = list(zip(queries, search_executor.map(lambda q: fetch_search_results(q, retries), queries)))
+    merged = merge_search_results(results_per_query)
+    return format_search_results(merged, len(queries) > 1, question) if merged else None
+
+async def web_search_async(query, retries=MAX_SEARCH_RETRIES, question=None):
+    """Awaitable web_search (DDGS is blocking, so it runs on the search thread pool)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(search_executor, web_search, query, retries, question)
+
+async def gather_search_results_async(queries, retries=MAX_SEARCH_RETRIES):
+    """Fetch several queries concurrently, returns a list of (query, results) pairs"""
+    loop = asyncio.get_running_loop()
+    queries = unique_queries(queries)
+    results = await asyncio.gather(*[
+        loop.run_in_executor(search_executor, fetch_search_results, query, retries)
+        for query in queries
+    ])
+    return list(zip(queries, results))
+
+async def multi_search_async(queries, retries=MAX_SEARCH_RETRIES, question=None):
+    """Awaitable multi_search: all queries run concurrently on the search thread pool"""
+    results_per_query = await gather_search_results_async(queries, retries)
+    merged = merge_search_results(results_per_query)
+    return format_search_results(merged, len(results_per_query) > 1, question) if merged else None
+
+# ------------------ Semantic Response Cache ------------------
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+def get_semantic_cache(config):
+    """The semantic response cache, or None if disabled in config or NumPy is missing"""
+    global _semantic_cache
+    if not config.get("semantic_cache", DEFAULT_CONFIG["semantic_cache"]) or not NUMPY_AVAILABLE:
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache(SEMANTIC_CACHE_SIZE, path=SEMANTIC_CACHE_FILE)
+        _semantic_cache.threshold = config.get("semantic_cache_threshold", DEFAULT_CONFIG["semantic_cache_threshold"])
+    return _semantic_cache
+
+def get_semantic_cache_stats():
+    """Hit/miss counters of the semantic response cache ({} if disabled)"""
+    return _semantic_cache.stats() if _semantic_cache is not None else {}
+
+def embed_texts(texts, config, priority=INTERACTIVE):
+    """Embedding vectors of several texts (one Ollama call) with the configured embedding model"""
+    model_name = config.get("embedding_model", DEFAULT_CONFIG["embedding_model"])
+    with ollama_scheduler.slot(priority):
+        response = ollama.embed(model=model_name, input=[t.strip() for t in texts], keep_alive=model_keep_alive(config))
+    return response["embeddings"]
+
+def embed_text(text, config, priority=INTERACTIVE):
+    """Embedding vector of a text with the configured Ollama embedding model"""
+    return embed_texts([text], config, priority)[0]
+
+def fresh_session(session_id):
+    """True if the session has no stored turns (so no history, summary or memories in the prompt)"""
     try:
-        if tool_name in ['time', 'get_time', 'current_time']:
-            return (True, datetime.now().strftime('%H:%M:%S'))
-        
-        elif tool_name in ['date', 'get_date', 'current_date']:
-            return (True, datetime.now().strftime('%Y-%m-%d'))
-        
-        elif tool_name in ['datetime', 'get_datetime']:
-            return (True, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        
-        elif tool_name in ['day', 'weekday', 'day_of_week']:
-            return (True, datetime.now().strftime('%A'))
-        
-        elif tool_name in ['timestamp', 'unix_time']:
-            return (True, str(int(datetime.now().timestamp())))
-        
-        elif tool_name in ['year']:
-            return (True, str(datetime.now().year))
-        
-        elif tool_name in ['month']:
-            return (True, datetime.now().strftime('%B'))
-        
-        # Math operations
-        elif tool_name in ['calculate', 'calc', 'math']:
-            if args:
-                try:
-                    # Safe eval for basic math
-                    result = eval(args, {"__builtins__": {}}, {})
-                    return (True, str(result))
-                except:
-                    return (False, "Invalid calculation")
-            return (False, "No expression provided")
-        
-        # System info
-        elif tool_name in ['system', 'os', 'platform']:
-            import platform
-            return (True, f"{platform.system()} {platform.release()}")
-        
-        elif tool_name in ['python_version']:
-            import sys
-            return (True, sys.version.split()[0])
-        
-        else:
-            return (False, f"Unknown tool: {tool_name}")
-    
+        return get_store().count(session_id) == 0
+    except Exception as e:
+        print(f"⚠ History check error: {e}")
+        return False
+
+async def semantic_cache_lookup(user_input, session_id, config):
+    """
+    Look up a stored answer for a similar prompt of the same session.
+    Only context-free prompts (first turn of a session) are looked up:
+    "yes" or "what's my name?" depend on what came before.
+    Returns (answer or None, prompt embedding or None)
+    """
+    cache = get_semantic_cache(config)
+    if cache is None or not fresh_session(session_id):
+        return None, None
+    try:
+        vector = await asyncio.to_thread(embed_text, user_input, config)
     except Exception as e:
-        return (False, f"Tool error: {str(e)}")
+        print(f"⚠ Embedding error: {e}")
+        return None, None
+    answer, similarity = cache.get(vector, config.get("model", "llama3.2"), scope=session_id)
+    if answer is not None:
+        print(f"⚡ Semantic cache hit (similarity {similarity:.3f})")
+    return answer, vector
+
+async def semantic_cache_store(vector, user_input, answer, session_id, config):
+    """
+    Remember the answer to a prompt for its session (only for turns without
+    history, memories, tools or search in the prompt)
+    """
+    cache = get_semantic_cache(config)
+    if cache is None or vector is None:
+        return
+    await asyncio.to_thread(cache.put, vector, user_input, answer, config.get("model", "llama3.2"), session_id)
+
+# ------------------ Long-Term Memory ------------------
+MEMORY_BATCH = 64           # Turns embedded per Ollama call while indexing
+MEMORY_TEXT_CHARS = 2000    # Characters of a turn that get embedded
+MEMORY_SNIPPET_CHARS = 300  # Characters of a recalled turn put into the prompt
+
+_memory_index = None
+_memory_lock = threading.Lock()
+memory_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jarvis-memory")
+_memory_update_pending = False
+
+def memory_enabled(config):
+    return bool(config.get("long_term_memory", DEFAULT_CONFIG["long_term_memory"])) and OLLAMA_AVAILABLE and NUMPY_AVAILABLE
+
+def get_memory_index():
+    """The long-term memory index (created on first use)"""
+    global _memory_index
+    with _memory_lock:
+        if _memory_index is None:
+            _memory_index = MemoryIndex(MEMORY_DIR)
+        return _memory_index
+
+def get_memory_stats():
+    """Size of the long-term memory index ({} if not loaded)"""
+    return _memory_index.stats() if _memory_index is not None else {}
+
+def schedule_memory_update():
+    """Embed new turns in the background (at most one update queued at a time)"""
+    global _memory_update_pending
+    config = load_config()
+    if not memory_enabled(config):
+        return
+    with _memory_lock:
+        if _memory_update_pending:
+            return
+        _memory_update_pending = True
+    memory_executor.submit(update_memory_index, config)
+
+def update_memory_index(config):
+    """Embed every stored user/assistant turn newer than the index, in batches"""
+    global _memory_update_pending
+    with _memory_lock:
+        _memory_update_pending = False
+    try:
+        index = get_memory_index()
+        index.ensure_model(config.get("embedding_model", DEFAULT_CONFIG["embedding_model"]))
+        store = get_store()
+        added = 0
+        while True:
+            rows = store.messages_after(index.last_id, MEMORY_BATCH * 2)
+            if not rows:
+                break
+            if len(rows) == MEMORY_BATCH * 2 and rows[-1][2] == "user":
+                rows = rows[:-1]  # Its answer is in the next batch
+            
+            turns, texts = [], []
+            questions = {}  # session -> (id, content) of the last user message
+            for message_id, session, role, content in rows:
+                if role == "user":
+                    questions[session] = (message_id, content)
+                elif role == "assistant" and session in questions:
+                    turn_id, question = questions.pop(session)
+                    turns.append((turn_id, message_id, session))
+                    texts.append(f"User: {question}\nJARVIS: {content}"[:MEMORY_TEXT_CHARS])
+            
+            vectors = embed_texts(texts, config, BACKGROUND) if texts else []
+            index.add(turns, vectors, rows[-1][0])
+            added += len(turns)
+        if added:
+            print(f"🧠 Memory index: {added} turns added ({index.stats()['turns']} total)")
+    except Exception as e:
+        print(f"⚠ Memory index update error: {e}")
+
+def clip_text(text, max_chars):
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+def format_memory(question, answer, created):
+    """One '- (date) User: ... | JARVIS: ...' line for the prompt"""
+    return (f"- ({created[:10]}) User: {clip_text(question, MEMORY_SNIPPET_CHARS)} | "
+            f"JARVIS: {clip_text(answer, MEMORY_SNIPPET_CHARS)}")
+
+async def recall_memories(user_input, session_id, config, vector=None):
+    """
+    Top-k earlier turns of the session most similar to the input
+    Returns a list of (turn_id, text) for assemble_history
+    """
+    if not memory_enabled(config):
+        return []
+    index = get_memory_index()
+    if not index.stats()["turns"]:
+        return []
+    try:
+        if vector is None:
+            vector = await asyncio.to_thread(embed_text, user_input, config)
+    except Exception as e:
+        print(f"⚠ Embedding error: {e}")
+        return []
+    
+    hits = index.search(
+        vector,
+        k=config.get("memory_top_k", DEFAULT_CONFIG["memory_top_k"]),
+        session=session_id,
+        before_id=history_anchors.get(session_id) or None,
+        min_score=config.get("memory_min_similarity", DEFAULT_CONFIG["memory_min_similarity"])
+    )
+    if not hits:
+        return []
+    stored = get_store().messages_by_ids([i for hit in hits for i in hit[:2]])
+    memories = []
+    for turn_id, answer_id, score in hits:
+        if turn_id in stored and answer_id in stored:
+            memories.append((turn_id, format_memory(stored[turn_id][1], stored[answer_id][1], stored[turn_id][2])))
+    if memories:
+        print(f"🧠 Recalled {len(memories)} memories (best similarity {hits[0][2]:.3f})")
+    return memories
+
+# ------------------ System Tools/Modules ------------------
+# Pattern: TOOL("tool_name") or TOOL("tool_name", "args")
+TOOL_PATTERN = re.compile(r'TOOL\s*\(\s*["\']([^"\']+)["\']\s*(?:,\s*["\']([^"\']+)["\']\s*)?\)', re.IGNORECASE)
+# Pattern: SEARCH("query")
+SEARCH_PATTERN = re.compile(r'SEARCH\s*\(\s*["\'](.+?)["\']\s*\)', re.IGNORECASE)
+
+async def execute_system_tool_async(tool_name, args=None):
+    """Awaitable execute_system_tool, runs in a worker thread"""
+    return await asyncio.to_thread(execute_system_tool, tool_name, args)
 
 def detect_tool_usage(text):
     """
     Detect if the AI is trying to use a system tool
     Returns (has_tool, tool_name, args) tuple
     """
-    # Pattern: TOOL("tool_name") or TOOL("tool_name", "args")
-    tool_pattern = r'TOOL\s*\(\s*["\']([^"\']+)["\']\s*(?:,\s*["\']([^"\']+)["\']\s*)?\)'
-    match = re.search(tool_pattern, text, re.IGNORECASE)
+    match = TOOL_PATTERN.search(text)
     
     if match:
         tool_name = match.group(1)
@@ -326,60 +916,224 @@ def detect_tool_usage(text):
     
     return (False, None, None)
 
+# ------------------ Native Tool Calling ------------------
+WEB_SEARCH_TOOL_NAME = "web_search"
+WEB_SEARCH_TOOL = {
+    "type": "function",
+    "function": {
+        "name": WEB_SEARCH_TOOL_NAME,
+        "description": "Search the web for current information (weather, news, prices, results, recent events)",
+        "parameters": {
+            "type": "object",
+            "properties": {"query": {"type": "string", "description": "Search query"}},
+            "required": ["query"]
+        }
+    }
+}
+
+TOOL_SUPPORT_RETRY = 60  # Seconds before a failed capability check is repeated
+
+_tool_support = {}        # model -> accepts Ollama's `tools` parameter
+_tool_support_failed = {} # model -> time of the last failed check
+
+def model_supports_tools(model_name):
+    """Ask Ollama (once per model) whether the model supports structured tool calls (blocking)"""
+    supported = _tool_support.get(model_name)
+    if supported is not None:
+        return supported
+    if time.time() - _tool_support_failed.get(model_name, 0) < TOOL_SUPPORT_RETRY:
+        return False
+    try:
+        info = ollama.show(model_name)
+        capabilities = info.get("capabilities")
+        if capabilities is None:
+            # Older servers: tool-capable chat templates render .Tools
+            supported = ".Tools" in (info.get("template") or "")
+        else:
+            supported = "tools" in capabilities
+    except Exception as e:
+        # Checked again later: the server may just not be up yet
+        print(f"⚠ Tool support check failed for {model_name}: {e}")
+        _tool_support_failed[model_name] = time.time()
+        return False
+    _tool_support[model_name] = supported
+    if not supported:
+        print(f"🔧 {model_name} has no native tool support, using the TOOL()/SEARCH() text protocol")
+    return supported
+
+def native_tools(config, model_names):
+    """
+    Ollama `tools` definitions (registry + web_search) when native tool
+    calling is enabled and every given model supports it, else None
+    (text protocol with the full rules prompt)
+    """
+    if not OLLAMA_AVAILABLE or not config.get("native_tools", DEFAULT_CONFIG["native_tools"]):
+        return None
+    if not all(model_supports_tools(model_name) for model_name in model_names):
+        return None
+    tools = tool_schemas()
+    if WEB_SEARCH_AVAILABLE:
+        tools.append(WEB_SEARCH_TOOL)
+    return tools
+
+def without_search_tool(tools):
+    return [t for t in tools if t["function"]["name"] != WEB_SEARCH_TOOL_NAME]
+
+def tool_call_argument(arguments):
+    """Registry tools take one string argument ("args", or whatever single key the model chose)"""
+    if not arguments:
+        return None
+    value = arguments.get("args", next(iter(arguments.values())))
+    return None if value in (None, "") else str(value)
+
+async def run_tool_calls(tool_calls, question=None):
+    """
+    Execute all tool calls of one response together: registry tools in
+    worker threads, every web_search query as one parallel multi-search.
+    Returns (role "tool" messages in call order, whether a search ran)
+    """
+    searches = [c for c in tool_calls if c["function"]["name"] == WEB_SEARCH_TOOL_NAME]
+    tools = [c for c in tool_calls if c["function"]["name"] != WEB_SEARCH_TOOL_NAME]
+    queries = unique_queries([
+        str(c["function"]["arguments"].get("query") or "").strip() for c in searches
+    ])
+    queries = [q for q in queries if q]
+    
+    jobs = [
+        execute_system_tool_async(c["function"]["name"], tool_call_argument(c["function"]["arguments"]))
+        for c in tools
+    ]
+    if queries:
+        jobs.append(multi_search_async(queries, question=question) if WEB_SEARCH_AVAILABLE else asyncio.sleep(0))
+    if len(tool_calls) > 1:
+        print(f"🔧 Running {len(tool_calls)} tool calls in parallel")
+    else:
+        print(f"🔧 Using tool: {tool_calls[0]['function']['name']}")
+    with metrics.span("tool_calls"):
+        results = await asyncio.gather(*jobs)
+    search_results = results.pop() if queries else None
+    
+    messages = []
+    tool_results = iter(results)
+    search_reported = False
+    for call in tool_calls:
+        name = call["function"]["name"]
+        if name == WEB_SEARCH_TOOL_NAME:
+            if search_reported:
+                content = "Results for this query are included in the previous web_search result."
+            elif search_results is None:
+                content = "The search failed. Answer based on your existing knowledge instead."
+            else:
+                content = f"{search_results}\n\nAnswer the user's question directly from these results, don't just list websites."
+            search_reported = True
+        else:
+            success, result = next(tool_results)
+            metrics.inc("jarvis_tool_calls_total", tool=tool_label(name), result="ok" if success else "error")
+            content = result if success else f"Tool failed: {result}. Answer based on your knowledge."
+        messages.append({"role": "tool", "content": content, "tool_name": name})
+    return messages, bool(queries)
+
 # ------------------ Intelligent Search Detection ------------------
+# (trigger, keyword patterns, query builder) - list order is priority: when several
+# triggers match, the earliest one wins, so specific triggers come before generic ones.
+# Generic triggers (no query builder) mean "let the AI decide".
+SEARCH_TRIGGERS = [
+    ('weather', [r'weather', r'forecast', r'időjárás\w*', r'előrejelzés\w*'],
+     lambda text: f"weather {extract_location(text)} today"),
+    ('temperature', [r'temperatures?', r'hőmérséklet\w*', r'hány fok'],
+     lambda text: f"temperature {extract_location(text)} now"),
+    ('news', [r'news', r'headlines?', r'hír', r'hírek\w*'],
+     lambda text: f"latest news {extract_topic(text)} {datetime.now().year}"),
+    ('stock', [r'stocks?', r'részvény\w*', r'árfolyam\w*'],
+     lambda text: f"stock price {extract_topic(text)}"),
+    ('price', [r'prices?', r'ár(?:a|át|ak|akat)?', r'mennyibe kerül\w*'],
+     lambda text: f"current price {extract_topic(text)}"),
+    ('score', [r'scores?', r'eredmény\w*'],
+     lambda text: f"latest {extract_topic(text)} score"),
+    ('match', [r'match(?:es)?', r'meccs\w*', r'mérkőzés\w*'],
+     lambda text: f"latest {extract_topic(text)} match result"),
+    ('when', [r'when', r'mikor'], None),  # "when" questions often need search
+    ('today', [r'today', r'tonight', r'ma', r'mai'], None),
+    ('now', [r'now', r'most'], None),
+    ('current', [r'current(?:ly)?', r'jelenlegi', r'aktuális'], None),
+    ('latest', [r'latest', r'recent(?:ly)?', r'legújabb\w*', r'legfrissebb\w*'], None),
+]
+
+# One precompiled alternation over lowercased text, each trigger is a named group (t0, t1, ...)
+SEARCH_TRIGGER_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(
+        rf"(?P<t{i}>{'|'.join(keywords)})"
+        for i, (_, keywords, _) in enumerate(SEARCH_TRIGGERS)
+    ) + r')\b'
+)
+
+def match_search_trigger(user_input):
+    """
+    Find the highest-priority search trigger in the text (whole words only)
+    Returns (trigger_name, query_builder) or (None, None)
+    """
+    best = None
+    for match in SEARCH_TRIGGER_PATTERN.finditer(user_input.lower()):
+        index = int(match.lastgroup[1:])
+        if best is None or index < best:
+            best = index
+            if best == 0:
+                break
+    if best is None:
+        return (None, None)
+    name, _, query_builder = SEARCH_TRIGGERS[best]
+    return (name, query_builder)
+
 def should_auto_search(user_input):
     """
     Detect if user input requires automatic web search
     Returns (should_search, query) tuple
     """
-    user_lower = user_input.lower()
-    
-    # Keywords that indicate need for current info
-    search_triggers = {
-        'weather': lambda text: f"weather {extract_location(text)} today",
-        'temperature': lambda text: f"temperature {extract_location(text)} now",
-        'news': lambda text: f"latest news {extract_topic(text)} {datetime.now().year}",
-        'stock': lambda text: f"stock price {extract_topic(text)}",
-        'price': lambda text: f"current price {extract_topic(text)}",
-        'score': lambda text: f"latest {extract_topic(text)} score",
-        'match': lambda text: f"latest {extract_topic(text)} match result",
-        'when': lambda text: None,  # "when" questions often need search
-        'today': lambda text: None,
-        'now': lambda text: None,
-        'current': lambda text: None,
-        'latest': lambda text: None,
-    }
-    
-    for trigger, query_builder in search_triggers.items():
-        if trigger in user_lower:
-            if query_builder:
-                query = query_builder(user_input)
-                return (True, query)
-            # For generic triggers, let the AI decide
-            return (False, None)
-    
+    trigger, query_builder = match_search_trigger(user_input)
+    if query_builder:
+        return (True, query_builder(user_input))
+    # No trigger, or a generic trigger: let the AI decide
     return (False, None)
 
+LOCATION_STOPWORDS = {
+    'i', 'what', "what's", 'whats', 'how', "how's", 'when', 'is', 'will', 'tell', 'give', 'show',
+    'weather', 'temperature', 'today', 'now', 'please',
+    'milyen', 'mi', 'mennyi', 'hány', 'mondd', 'ma', 'most', 'hol', 'kérlek'
+}
+LOCATION_PREPOSITIONS = {'in', 'at', 'for', 'near', 'around'}
+
 def extract_location(text):
     """Extract location from text (simple approach)"""
-    # Common location patterns
-    words = text.split()
-    # Look for capitalized words that might be locations
-    for i, word in enumerate(words):
-        if word[0].isupper() and word.lower() not in ['i', 'what', 'how', 'when']:
+    words = re.findall(r"[\w'-]+", text)
+    # A capitalized word after "in"/"at"/... is the best guess
+    for prev, word in zip(words, words[1:]):
+        if prev.lower() in LOCATION_PREPOSITIONS and word[0].isupper():
+            return word
+    # Otherwise look for capitalized words that might be locations
+    for word in words:
+        if word[0].isupper() and word.lower() not in LOCATION_STOPWORDS:
             return word
     return "here"
 
+TOPIC_STOPWORDS = {
+    'what', "what's", 'how', 'is', 'are', 'the', 'a', 'an', 'about', 'of', 'for', 'me', 'tell',
+    'mi', 'az', 'egy', 'van', 'mennyi', 'milyen', 'kérlek'
+}
+
 def extract_topic(text):
     """Extract topic from text"""
-    # Remove common question words
-    remove_words = ['what', 'how', 'when', 'is', 'the', 'latest', 'current', 'news', 'about', 'price', 'of']
-    words = [w for w in text.lower().split() if w not in remove_words]
+    # Remove trigger keywords and common question words
+    text = SEARCH_TRIGGER_PATTERN.sub(' ', text.lower())
+    words = [w for w in re.findall(r"[\w'-]+", text) if w not in TOPIC_STOPWORDS]
     return ' '.join(words[:3]) if words else ""
 
 # ------------------ Fallback Decision Making ------------------
 def fallback_decision(input_text):
     """Fallback logic when Ollama is not available"""
+    fast = answer_intent(input_text)
+    if fast is not None:
+        return fast[0]
+    
     input_lower = input_text.lower()
     
     # Basic responses
@@ -401,37 +1155,445 @@ def fallback_decision(input_text):
     return "I apologize, but I'm running in limited mode. Please install Ollama for full functionality: https://ollama.ai"
 
 
+# ------------------ Streaming Generation ------------------
+# Start of a TOOL(/SEARCH( marker, or a partial keyword at the very end of the buffer
+MARKER_START_PATTERN = re.compile(
+    r'(?:TOOL|SEARCH)\s*\(|\b(?:T(?:O(?:O(?:L)?)?)?|S(?:E(?:A(?:R(?:C(?:H)?)?)?)?)?)\s*$',
+    re.IGNORECASE
+)
+
+# Text after a complete SEARCH() that may still turn into another SEARCH() call
+SEARCH_CONTINUATION_PATTERN = re.compile(
+    r'[\s,;.:*\-\d]*(?:(?:and|és)\s*)?(?:S(?:E(?:A(?:R(?:C(?:H)?)?)?)?)?(?:\s*\(.*)?)?$',
+    re.IGNORECASE | re.DOTALL
+)
+
+# One AsyncClient per event loop (httpx clients can't be shared across loops)
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    """Return the ollama.AsyncClient bound to the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = ollama.AsyncClient()
+        _async_clients[loop] = client
+    return client
+
+async def close_async_client():
+    """Close the running loop's AsyncClient (its httpx connection pool)"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    close = getattr(client, "close", None)
+    if close:
+        await close()
+
+async def stream_chat_async(model_name, messages, stream_callback=None, options=None, keep_alive=None,
+                            priority=INTERACTIVE, tools=None, tool_calls=None):
+    """
+    Stream a chat completion from Ollama and return the generated text.
+    Tokens are forwarded to stream_callback as they arrive; text that may be
+    the start of a TOOL()/SEARCH() marker is held back. Generation is cut off
+    as soon as a complete marker is in the buffer. The call waits for a
+    scheduler slot of the given priority class first.
+    With native tools, structured tool calls are appended to tool_calls.
+    """
+    async with ollama_scheduler.slot_async(priority):
+        with metrics.span("model"):
+            return await _stream_chat(model_name, messages, stream_callback, options, keep_alive, tools, tool_calls)
+
+def plain_tool_call(call):
+    """Ollama ToolCall (model or dict) -> {"function": {"name", "arguments"}}"""
+    function = call["function"]
+    return {"function": {"name": function["name"], "arguments": dict(function.get("arguments") or {})}}
+
+async def _stream_chat(model_name, messages, stream_callback, options, keep_alive, tools=None, tool_calls=None):
+    buffer = ""
+    emitted = 0
+    chunks = 0
+    final_chunk = None  # Carries Ollama's token counts and durations
+    start = time.perf_counter()
+    request = {"tools": tools} if tools else {}
+    stream = await get_async_client().chat(
+        model=model_name, messages=messages, stream=True, options=options, keep_alive=keep_alive, **request
+    )
+    try:
+        async for chunk in stream:
+            chunks += 1
+            if chunk.get('done'):
+                final_chunk = chunk
+            calls = chunk['message'].get('tool_calls')
+            if calls and tool_calls is not None:
+                tool_calls.extend(plain_tool_call(call) for call in calls)
+            buffer += chunk['message']['content'] or ""
+            
+            # Complete marker -> stop decoding, the loop in askAI handles it
+            complete = bool(TOOL_PATTERN.search(buffer))
+            if not complete:
+                last_search = None
+                for last_search in SEARCH_PATTERN.finditer(buffer):
+                    pass
+                # Keep decoding only while the model is emitting more SEARCH() calls
+                complete = bool(last_search) and not SEARCH_CONTINUATION_PATTERN.match(buffer, last_search.end())
+            
+            # Text up to the first (possible) marker is shown, also when the
+            # marker completed in the same chunk
+            if stream_callback:
+                marker = MARKER_START_PATTERN.search(buffer, emitted)
+                safe_end = marker.start() if marker else len(buffer)
+                if safe_end > emitted:
+                    stream_callback(buffer[emitted:safe_end])
+                    emitted = safe_end
+            if complete:
+                break
+        else:
+            # Stream finished normally: flush anything held back
+            if stream_callback and emitted < len(buffer):
+                stream_callback(buffer[emitted:])
+    finally:
+        # Closing the generator drops the HTTP stream, so Ollama stops generating
+        aclose = getattr(stream, "aclose", None)
+        if aclose:
+            await aclose()
+        metrics.record_model_call(model_name, final_chunk, chunks, time.perf_counter() - start)
+    
+    return buffer
+
+# ------------------ Speculative Auto-Search ------------------
+class BufferedCallback:
+    """Stream callback that holds tokens back until go_live() is called"""
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.pending = []
+        self.live = False
+
+    def __call__(self, text):
+        if self.live:
+            if self.callback:
+                self.callback(text)
+        else:
+            self.pending.append(text)
+
+    def go_live(self):
+        """Flush held-back tokens and forward everything from now on"""
+        self.live = True
+        if self.callback:
+            for text in self.pending:
+                self.callback(text)
+        self.pending = []
+
+class RoundSeparator:
+    """
+    Stream callback of a whole turn. Text a round streamed before its
+    TOOL()/SEARCH() request stays on screen, so the next round's answer
+    starts on a new paragraph instead of running on from it.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.round_text = False  # Current round streamed something
+        self.separate = False    # Next text starts a new round
+
+    def __call__(self, text):
+        if not text:
+            return
+        if self.separate:
+            self.separate = False
+            self.callback("\n\n")
+        self.round_text = True
+        self.callback(text)
+
+    def next_round(self):
+        """Called before each generation of the turn"""
+        if self.round_text:
+            self.separate = True
+        self.round_text = False
+
+async def speculative_search(model_name, messages, query, stream_callback=None, options=None, keep_alive=None,
+                             tools=None, tool_calls=None):
+    """
+    Run the auto-search and a first generation at the same time, so search
+    latency hides behind model latency (and the prompt prefix gets prefilled).
+    Returns (response_text, search_results):
+    - search landed first: generation is cancelled -> (None, results)
+    - model answered without SEARCH(): speculation abandoned -> (response, None),
+      any other native tool calls it made are appended to tool_calls
+    - model asked for SEARCH() (or called web_search): wait for the search -> (None, results)
+    - model called web_search together with other tools: (response, None), all
+      calls appended to tool_calls
+    """
+    output = BufferedCallback(stream_callback)
+    question = messages[-1]["content"]
+    calls = []
+    search_task = asyncio.ensure_future(gather_search_results_async([query]))
+    generation = asyncio.ensure_future(stream_chat_async(
+        model_name, messages, output, options, keep_alive, tools=tools, tool_calls=calls
+    ))
+    
+    try:
+        done, _ = await asyncio.wait({search_task, generation}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        # Turn stopped: asyncio.wait leaves both tasks running otherwise
+        search_task.cancel()
+        generation.cancel()
+        raise
+    
+    if search_task in done:
+        merged = merge_search_results(search_task.result())
+        if merged:
+            print("⚡ Search results landed first, restarting generation with them")
+            generation.cancel()
+            try:
+                await generation
+            except asyncio.CancelledError:
+                # Only swallow our own cancel, a stopped turn must keep unwinding
+                current = asyncio.current_task()
+                if current is not None and current.cancelling():
+                    raise
+            return None, format_search_results(merged, question=question)
+        
+        # Search failed: the speculative generation becomes the answer
+        output.go_live()
+        response_text = (await generation).strip()
+        if tool_calls is not None:
+            tool_calls.extend(calls)
+        return response_text, None
+    
+    response_text = generation.result().strip()
+    requested = SEARCH_PATTERN.findall(response_text) + [
+        str(c["function"]["arguments"].get("query") or "")
+        for c in calls if c["function"]["name"] == WEB_SEARCH_TOOL_NAME
+    ]
+    requested = [q for q in requested if q.strip()]
+    other_calls = [c for c in calls if c["function"]["name"] != WEB_SEARCH_TOOL_NAME]
+    if not requested or (other_calls and tool_calls is not None):
+        # No search wanted, or searches mixed with other tool calls: every
+        # call of the response runs together in the askAI loop
+        print("⚡ Answered without search, speculation abandoned" if not requested
+              else "⚡ Search requested with other tool calls, running them together")
+        search_task.cancel()
+        output.go_live()
+        if tool_calls is not None:
+            tool_calls.extend(calls)
+        return response_text, None
+    
+    # Model wants search results: use the speculative search plus any other queries it asked for
+    extra = [q for q in requested if normalize_query(q) != normalize_query(query)]
+    auto_results, extra_results = await asyncio.gather(search_task, gather_search_results_async(extra))
+    results_per_query = auto_results + extra_results
+    merged = merge_search_results(results_per_query)
+    if not merged:
+        return None, None
+    return None, format_search_results(merged, len(results_per_query) > 1, question)
+
+# ------------------ Model Routing ------------------
+def route_turn(user_input, should_search, config):
+    """Pick the model tier for a turn by complexity: returns (tiers, tier index)"""
+    tiers = model_tiers(config)
+    score = complexity_score(user_input, should_search)
+    index = select_tier(tiers, score)
+    tier = tiers[index]
+    metrics.inc("jarvis_route_total", tier=tier["name"])
+    metrics.observe("jarvis_route_score", score, metrics.SCORE_BUCKETS, tier=tier["name"])
+    record = metrics.current_turn()
+    if record is not None:
+        record.route = {"tier": tier["name"], "model": tier["model"], "score": score, "escalations": []}
+    if len(tiers) > 1:
+        print(f"🧭 Complexity {score} -> {tier['name']} ({tier['model']})")
+    return tiers, index
+
+async def generate_routed(tiers, index, messages, stream_callback=None, options=None, keep_alive=None,
+                          priority=INTERACTIVE, escalate=True, tools=None, tool_calls=None):
+    """
+    One round trip on tier `index`. Below the top tier the output is held
+    back and validated; a failed answer is discarded and generated again on
+    the next tier. Returns (response_text, tier index that produced it).
+    """
+    while True:
+        tier = tiers[index]
+        can_escalate = escalate and index < len(tiers) - 1
+        output = BufferedCallback(stream_callback) if can_escalate else stream_callback
+        calls = []
+        start = time.perf_counter()
+        response_text = (await stream_chat_async(
+            tier["model"], messages, output, options, keep_alive, priority, tools, calls
+        )).strip()
+        metrics.observe("jarvis_tier_seconds", time.perf_counter() - start, tier=tier["name"])
+        
+        # A structured tool call is a valid answer even without text
+        reason = validate_output(response_text) if can_escalate and not calls else None
+        if reason is None:
+            if can_escalate:
+                output.go_live()
+            if tool_calls is not None:
+                tool_calls.extend(calls)
+            return response_text, index
+        
+        index += 1
+        print(f"⬆ {tier['name']} answer rejected ({reason}), escalating to {tiers[index]['name']}")
+        metrics.inc("jarvis_escalations_total", tier=tier["name"], reason=reason)
+        record = metrics.current_turn()
+        if record is not None and record.route:
+            record.route["escalations"].append({"from": tier["name"], "reason": reason})
+            record.route.update(tier=tiers[index]["name"], model=tiers[index]["model"])
+
+# ------------------ Cancellation ------------------
+def cancel_turn(user_message, partial, session_id):
+    """
+    Record a stopped turn: the text streamed so far is kept as the answer, so
+    the history shows what the user actually saw
+    """
+    if partial:
+        finish_turn(user_message, partial, session_id, "cancelled", cancelled=True)
+        return
+    with metrics.span("persist"):
+        log_interaction(user_message["content"], "", session_id, cancelled=True)
+    record = metrics.current_turn()
+    if record is not None:
+        record.outcome = "cancelled"
+
 # ------------------ Ollama Chat Function ------------------
-def askAI(user_input, stream_callback=None):
+async def askAI_async(user_input, stream_callback=None, session_id=DEFAULT_SESSION, cancel_token=None):
     """
-    Chat with Ollama model with web search support and automatic search detection
+    Chat with Ollama model with web search support and automatic search detection.
+    Coroutine version: many conversations can share one event loop.
+    With a cancel_token the turn can be stopped; it then returns the partial answer.
     """
-    config = load_config()
-    history = load_history()
+    streamed = []  # Everything shown to the user, kept as the answer if the turn is stopped
+    
+    def collect(text):
+        streamed.append(text)
+        if stream_callback:
+            stream_callback(text)
+    
+    # Background Ollama work (summaries, scene descriptions...) waits while a turn is active
+    async with ollama_scheduler.user_turn():
+        with metrics.turn(session_id):
+            if cancel_token is not None:
+                cancel_token.bind(asyncio.current_task())
+            try:
+                return await _answer_turn(user_input, collect, session_id)
+            except asyncio.CancelledError:
+                if cancel_token is None or not cancel_token.cancelled:
+                    raise  # Not ours (shutdown, client gone): propagate
+                asyncio.current_task().uncancel()  # Handled here, the caller keeps running
+                partial = "".join(streamed).strip()
+                print(f"⏹ Turn stopped ({len(partial)} chars generated)")
+                if metrics.current_turn().outcome == "unknown":  # Not persisted yet
+                    cancel_turn({"role": "user", "content": user_input}, partial, session_id)
+                return partial
+            finally:
+                if cancel_token is not None:
+                    cancel_token.unbind()
+
+def finish_turn(user_message, answer, session_id, outcome, iterations=0, **log_extra):
+    """Persist a finished turn (history + journal) and close its metrics"""
+    with metrics.span("persist"):
+        append_history([user_message, {"role": "assistant", "content": answer}], session_id)
+        log_interaction(user_message["content"], answer, session_id, **log_extra)
+    record = metrics.current_turn()
+    if record is not None:
+        record.outcome = outcome
+        record.iterations = iterations
 
+async def _answer_turn(user_input, stream_callback, session_id):
+    if stream_callback:
+        stream_callback = RoundSeparator(stream_callback)
+    
+    with metrics.span("config_load"):
+        config = load_config()
+    
+    user_message = {"role": "user", "content": user_input}
+    
+    # Time/date/day/arithmetic/identity: answered from the tools, no model round trip
+    if config.get("fast_path", DEFAULT_CONFIG["fast_path"]):
+        with metrics.span("fast_path"):
+            fast = answer_intent(user_input)
+        if fast is not None:
+            answer, intent = fast
+            print(f"⚡ Fast path: {intent}")
+            if stream_callback:
+                stream_callback(answer)
+            finish_turn(user_message, answer, session_id, "fast_path", intent=intent)
+            return answer
+    
     if not OLLAMA_AVAILABLE:
         return "Ollama not available. Install from: https://ollama.ai"
     
     # Check if we should automatically search
-    should_search, auto_query = should_auto_search(user_input)
-    
-    # Add user message to history
-    history.append({"role": "user", "content": user_input})
+    with metrics.span("trigger_detection"):
+        should_search, auto_query = should_auto_search(user_input)
     
-    model_name = config.get("model", "llama3.2")
+    with metrics.span("routing"):
+        tiers, tier_index = route_turn(user_input, should_search, config)
+    escalate = config.get("escalate_on_failure", DEFAULT_CONFIG["escalate_on_failure"])
+    # Structured tool calls if every model this turn may use supports them
+    tools = await asyncio.to_thread(native_tools, config, [tier["model"] for tier in tiers[tier_index:]])
+    options = model_options(config)
+    keep_alive = model_keep_alive(config)
+    model_lifecycle.note_use()
     max_search_attempts = 2  # Maximum number of search attempts
+    max_iterations = 6       # Model round trips before giving up (tool loops)
     search_count = 0
+    iterations = 0      # Model round trips in this turn
+    used_tools = False  # Tool answers (time, date...) must not be cached
     
-    # Temporary history for search iterations (not saved until final answer)
-    temp_history = history.copy()
+    # Repeated non-time-sensitive questions are answered from the semantic cache
+    prompt_vector = None
+    if not should_search:
+        with metrics.span("semantic_cache"):
+            cached_answer, prompt_vector = await semantic_cache_lookup(user_input, session_id, config)
+        if cached_answer is not None:
+            if stream_callback:
+                stream_callback(cached_answer)
+            finish_turn(user_message, cached_answer, session_id, "cached", cached=True)
+            return cached_answer
+    
+    # Relevant turns from older conversation (beyond the context window)
+    with metrics.span("memory_recall"):
+        try:
+            memories = await recall_memories(user_input, session_id, config, prompt_vector)
+        except Exception as e:
+            print(f"⚠ Memory recall error: {e}")
+            memories = []
+    
+    # Temporary history for search iterations (not saved until final answer),
+    # trimmed to the token budget of the model's context window
+    with metrics.span("history_load"):
+        try:
+            temp_history = assemble_history(session_id, user_input, config, memories, tools)
+        except Exception as e:
+            print(f"⚠ History load error: {e}")
+            temp_history = [system_message(bool(tools)), user_message]
+    prompt_length = len(temp_history)
+    pending_response = None  # Answer already generated during speculation
+    pending_calls = []       # Native tool calls made during speculation
     
     try:
-        # If we detected a search need, perform it immediately
+        # If we detected a search need, start it together with the first generation
         if should_search and auto_query and WEB_SEARCH_AVAILABLE:
             print(f"🤖 Auto-detected search need: {auto_query}")
-            search_results = web_search(auto_query)
+            with metrics.span("auto_search"):
+                pending_response, search_results = await speculative_search(
+                    tiers[tier_index]["model"], temp_history, auto_query, stream_callback, options, keep_alive,
+                    tools, pending_calls
+                )
+            iterations += 1
             
-            if search_results:
+            if search_results and tools:
+                # Native protocol: present it as a web_search call and its result
+                temp_history.append({
+                    "role": "assistant",
+                    "content": "",
+                    "tool_calls": [{"function": {"name": WEB_SEARCH_TOOL_NAME, "arguments": {"query": auto_query}}}]
+                })
+                temp_history.append({
+                    "role": "tool",
+                    "content": f"{search_results}\n\nAnswer the user's question directly from these results, don't just list websites.",
+                    "tool_name": WEB_SEARCH_TOOL_NAME
+                })
+                search_count = 1
+            elif search_results:
                 # Inject search results before the AI responds
                 temp_history.append({
                     "role": "assistant",
@@ -449,21 +1611,46 @@ Do NOT just list websites - give them the actual information."""
                 })
                 search_count = 1  # Count the auto-search
         
-        while search_count < max_search_attempts:
-            # Get response from Ollama
-            response = ollama.chat(
-                model=model_name,
-                messages=temp_history,
-                stream=False
-            )
+        while search_count < max_search_attempts and iterations < max_iterations:
+            tool_calls = []
+            if pending_response is not None:
+                response_text, pending_response = pending_response, None
+                tool_calls, pending_calls = pending_calls, []
+            else:
+                iterations += 1
+                # Get response from Ollama (streamed, stops early on TOOL/SEARCH);
+                # answers to tool/search results run in the follow-up class
+                # Small tiers are validated and escalated to the next tier on failure
+                priority = INTERACTIVE if len(temp_history) == prompt_length else TOOL_FOLLOWUP
+                # Last allowed search used up: only registry tools stay available
+                round_tools = tools
+                if tools and search_count >= max_search_attempts - 1:
+                    round_tools = without_search_tool(tools)
+                if stream_callback:
+                    stream_callback.next_round()
+                response_text, tier_index = await generate_routed(
+                    tiers, tier_index, temp_history, stream_callback, options, keep_alive, priority, escalate,
+                    round_tools, tool_calls
+                )
             
-            response_text = response['message']['content'].strip()
+            # Native tool calls: all calls of the response run together
+            if tool_calls:
+                used_tools = used_tools or any(c["function"]["name"] != WEB_SEARCH_TOOL_NAME for c in tool_calls)
+                tool_messages, searched = await run_tool_calls(tool_calls, user_input)
+                if searched:
+                    search_count += 1
+                temp_history.append({"role": "assistant", "content": response_text, "tool_calls": tool_calls})
+                temp_history.extend(tool_messages)
+                continue
             
             # Check if model requested a system tool
             has_tool, tool_name, tool_args = detect_tool_usage(response_text)
             if has_tool:
                 print(f"🔧 Using tool: {tool_name}")
-                success, result = execute_system_tool(tool_name, tool_args)
+                used_tools = True
+                with metrics.span("tool"):
+                    success, result = await execute_system_tool_async(tool_name, tool_args)
+                metrics.inc("jarvis_tool_calls_total", tool=tool_label(tool_name), result="ok" if success else "error")
                 
                 if success:
                     # Add tool usage to temp history
@@ -489,15 +1676,18 @@ Do NOT just list websites - give them the actual information."""
                     continue
             
             # Check if model requested a web search
-            search_pattern = r'SEARCH\s*\(\s*["\'](.+?)["\']\s*\)'
-            search_matches = re.findall(search_pattern, response_text, re.IGNORECASE)
+            search_matches = SEARCH_PATTERN.findall(response_text)
             
             if search_matches and WEB_SEARCH_AVAILABLE and search_count < max_search_attempts:
                 search_count += 1
-                query = search_matches[0]
+                queries = unique_queries(search_matches)
+                query = '", "'.join(queries)
                 
-                # Perform search
-                search_results = web_search(query)
+                # Perform all requested searches in parallel
+                if len(queries) > 1:
+                    print(f"🔎 Running {len(queries)} searches in parallel")
+                with metrics.span("search"):
+                    search_results = await multi_search_async(queries, question=user_input)
                 
                 if search_results is None:
                     # Search failed, ask model to answer without search
@@ -535,52 +1725,177 @@ Do NOT request another search. Answer conversationally."""
             else:
                 # No search needed or max searches reached - this is the final answer
                 # Only save the original user message and final response to history
-                history.append({"role": "assistant", "content": response_text})
-                save_history(history)
+                finish_turn(user_message, response_text, session_id, "answer", iterations,
+                            searches=search_count, tools=used_tools, tier=tiers[tier_index]["name"])
+                # Context-free prompts only: [system, user], nothing recalled or searched
+                if not used_tools and search_count == 0 and not search_matches and prompt_length == 2:
+                    await semantic_cache_store(prompt_vector, user_input, response_text, session_id, config)
                 
                 return response_text
         
         # If we exit loop without returning (too many searches)
         final_msg = "I apologize, but I'm having trouble finding the right information. Could you rephrase your question?"
-        history.append({"role": "assistant", "content": final_msg})
-        save_history(history)
+        finish_turn(user_message, final_msg, session_id, "gave_up", iterations,
+                    searches=search_count, tools=used_tools)
         return final_msg
         
     except Exception as e:
         error_msg = f"I apologize, but I encountered an error: {str(e)}. Please try again."
         print(f"❌ Error in askAI: {e}")
         # Save error to history to maintain context
-        history.append({"role": "assistant", "content": error_msg})
-        save_history(history)
+        finish_turn(user_message, error_msg, session_id, "error", iterations, error=str(e))
         return error_msg
 
+def askAI(user_input, stream_callback=None, session_id=DEFAULT_SESSION, cancel_token=None):
+    """
+    Chat with Ollama model with web search support and automatic search detection.
+    Blocking wrapper around askAI_async for the Tk UI and the CLI.
+    """
+    async def run():
+        try:
+            return await askAI_async(user_input, stream_callback, session_id, cancel_token)
+        finally:
+            # The loop ends with this turn, its connection pool must not leak
+            await close_async_client()
+    return asyncio.run(run())
+
 # ------------------ Memory Logging ------------------
-def log_interaction(input_text, response):
-    """Log interaction to memory file"""
-    try:
-        memory = []
-        if LOG_FILE.exists():
-            with open(LOG_FILE, "r", encoding="utf-8") as f:
-                memory = json.load(f)
-        
-        memory.append({
-            "time": datetime.utcnow().isoformat(),
-            "input": input_text,
-            "response": response[:500] + "..." if len(response) > 500 else response,
-            "ai_type": "ollama" if OLLAMA_AVAILABLE else "fallback"
-        })
-        
-        # Keep only last 100 entries
-        memory = memory[-100:]
-        
-        with open(LOG_FILE, "w", encoding="utf-8") as f:
-            json.dump(memory, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"Memory log error: {e}")
+journal = InteractionJournal(JOURNAL_FILE)
+
+def log_interaction(input_text, response, session_id=DEFAULT_SESSION, **extra):
+    """Log interaction to the journal (queued, written by a background thread)"""
+    journal.log({
+        "time": datetime.utcnow().isoformat(),
+        "session": session_id,
+        "input": input_text,
+        "response": response,
+        "ai_type": "ollama" if OLLAMA_AVAILABLE else "fallback",
+        **extra
+    })
+
+def recent_interactions(limit=100):
+    """The last `limit` logged interactions, oldest first"""
+    return journal.recent(limit)
 
 # ------------------ Scene Analysis ------------------
-def analyze_scene(scene_data=None):
-    """Enhanced scene analysis"""
+DANGEROUS_OBJECTS = ("knife", "gun", "fire", "weapon")
+SCENE_DESCRIPTION_TTL = 5 * 60   # Seconds a description of the same objects is reused
+SCENE_DEBOUNCE = 2.0             # At most one description per window, for the latest objects
+SCENE_WAIT_TIMEOUT = 30.0        # How long a blocking analyze_scene waits for its description
+SCENE_CACHE_SIZE = 128
+
+@functools.lru_cache(maxsize=1024)
+def is_dangerous(label):
+    """Whether a detected class name counts as a threat (computed once per label)"""
+    label = label.lower()
+    return any(danger in label for danger in DANGEROUS_OBJECTS)
+
+def scene_key(objects):
+    """Canonical object multiset: (("cup", 1), ("person", 2))"""
+    counts = Counter(obj.lower().strip() for obj in objects if obj and obj.strip())
+    return tuple(sorted(counts.items()))
+
+class SceneDescriber:
+    """
+    Scene descriptions cached per object multiset (TTL). Requests are
+    throttled: within the debounce window only the newest object set is
+    kept, so a vision loop feeding every frame causes at most one
+    generation per window.
+    """
+
+    def __init__(self, debounce=SCENE_DEBOUNCE, ttl=SCENE_DESCRIPTION_TTL):
+        self.debounce = debounce
+        self.ttl = ttl
+        self.cache = TTLCache(SCENE_CACHE_SIZE)
+        self._cond = threading.Condition()
+        self._pending = None   # Newest key waiting for a generation
+        self._waiters = {}     # key -> (Event, [description])
+        self._last_run = 0.0
+        self._thread = None
+        self.generations = 0
+        self.coalesced = 0
+
+    def describe(self, objects, timeout=0.0):
+        """Cached description, or None if it is still being generated (waits up to timeout)"""
+        key = scene_key(objects)
+        cached = self.cache.get(key)
+        if cached is not None or not key:
+            return cached
+        with self._cond:
+            if self._pending is not None and self._pending != key:
+                # Superseded by newer objects: release its waiters
+                self.coalesced += 1
+                self._finish(self._pending, None)
+            self._pending = key
+            event, result = self._waiters.setdefault(key, (threading.Event(), []))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="jarvis-scene")
+                self._thread.start()
+            self._cond.notify()
+        if timeout and event.wait(timeout):
+            return result[0] if result else None
+        return None
+
+    def _finish(self, key, description):
+        """Wake the waiters of a key (condition lock must be held)"""
+        event, result = self._waiters.pop(key, (None, None))
+        if event is not None:
+            result.append(description)
+            event.set()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                delay = self._last_run + self.debounce - time.time()
+                if delay > 0:
+                    # Newer objects arriving meanwhile replace the pending ones
+                    self._cond.wait(delay)
+                    continue
+                key = self._pending
+                self._pending = None
+                self._last_run = time.time()
+
+            description = self.cache.get(key) or self._generate(key)
+            with self._cond:
+                self._finish(key, description)
+
+    def _generate(self, key):
+        # Most frequent objects first, e.g. "2 person, cup, knife"
+        names = [f"{count} {name}" if count > 1 else name for name, count in sorted(key, key=lambda item: -item[1])]
+        try:
+            prompt = f"Describe this scene briefly: {', '.join(names[:5])}"
+            config = load_config()
+            with ollama_scheduler.slot(BACKGROUND):
+                response = ollama.generate(
+                    model=config.get("model", "llama3.2"),
+                    prompt=prompt,
+                    keep_alive=model_keep_alive(config)
+                )
+            description = THINK_PATTERN.sub('', response["response"]).strip()
+            self.generations += 1
+            self.cache.put(key, description, self.ttl)
+            return description
+        except Exception as e:
+            print(f"⚠ Scene description error: {e}")
+            return None
+
+    def stats(self):
+        return {"generations": self.generations, "coalesced": self.coalesced, **self.cache.stats()}
+
+scene_describer = SceneDescriber()
+
+def get_scene_stats():
+    """Generation, coalescing and cache counters of the scene describer"""
+    return scene_describer.stats()
+
+def analyze_scene(scene_data=None, wait=True):
+    """
+    Enhanced scene analysis. Descriptions are cached per object multiset and
+    rate limited; with wait=False (continuous vision) the call never blocks
+    and returns the last known description for these objects or a fallback.
+    """
     analysis = {
         "objects_detected": [],
         "threat_level": 0,
@@ -592,27 +1907,39 @@ def analyze_scene(scene_data=None):
         analysis["objects_detected"] = objects
         
         # Calculate threat level
-        dangerous_objects = ["knife", "gun", "fire", "weapon"]
-        threat_count = sum(1 for obj in objects if any(danger in obj.lower() for danger in dangerous_objects))
+        threat_count = sum(1 for obj in objects if is_dangerous(obj))
         analysis["threat_level"] = min(threat_count * 3, 10)
         
         # Generate description with Ollama if available
         if OLLAMA_AVAILABLE and objects:
-            try:
-                prompt = f"Describe this scene briefly: {', '.join(objects[:5])}"
-                config = load_config()
-                response = ollama.generate(
-                    model=config.get("model", "llama3.2"),
-                    prompt=prompt
-                )
-                analysis["description"] = response["response"]
-            except:
-                analysis["description"] = f"Scene contains: {', '.join(objects[:5])}"
+            description = scene_describer.describe(objects, SCENE_WAIT_TIMEOUT if wait else 0.0)
+            analysis["description"] = description or f"Scene contains: {', '.join(objects[:5])}"
         else:
             analysis["description"] = f"Detected {len(objects)} objects"
     
     return analysis
 
+# ------------------ Metrics ------------------
+def get_metrics_snapshot():
+    """Turn/stage/token metrics plus scheduler, cache and tool statistics as one JSON-ready dict"""
+    return {
+        **metrics.snapshot(),
+        "scheduler": get_scheduler_stats(),
+        "model_tiers": model_tiers(load_config()),
+        "search_cache": get_search_cache_stats(),
+        "semantic_cache": get_semantic_cache_stats(),
+        "memory": get_memory_stats(),
+        "scene": get_scene_stats(),
+        "tools": get_tool_stats()
+    }
+
+def start_metrics_listener(port=None):
+    """Serve Prometheus /metrics and /metrics.json locally (metrics_port in config, 0 = off)"""
+    port = port if port is not None else load_config().get("metrics_port", DEFAULT_CONFIG["metrics_port"])
+    if port:
+        # Same /metrics.json as the aiohttp server
+        metrics.start_metrics_server(port=port, snapshot_source=get_metrics_snapshot)
+
 # ------------------ Get AI Status ------------------
 def get_ai_status():
     """Returns which AI systems are available"""
@@ -622,7 +1949,8 @@ def get_ai_status():
         "auto_search": WEB_SEARCH_AVAILABLE,
         "system_tools": True,
         "streaming": OLLAMA_AVAILABLE,
-        "internet_access": WEB_SEARCH_AVAILABLE
+        "internet_access": WEB_SEARCH_AVAILABLE,
+        "semantic_cache": OLLAMA_AVAILABLE and NUMPY_AVAILABLE and bool(load_config().get("semantic_cache"))
     }
 
 # ------------------ Test/CLI Mode ------------------
@@ -647,6 +1975,8 @@ if __name__ == "__main__":
     # Load config
     config = load_config()
     print(f"Model: {config.get('model', 'llama3.2')}")
+    start_model_lifecycle()
+    start_metrics_listener()
     print(f"Type 'exit' to quit, 'clear' to reset chat, 'config' to edit rules\n")
     print("="*60 + "\n")
     
@@ -1,17 +1,46 @@
 # jarvis_main.py
+import argparse
 import threading
-import time
 
-# ------------------ Modulok importálása ------------------
-from jarvis_boot import main as boot_main               # Boot GUI
-from jarvis_ui import main, speak               # GUI + TTS + animált fej
-from jarvis_3d_advanced import generate_material_preview  # 3D anyag generálás
-from jarvis_vision import start_vision                 # Kamera + objektumfelismerés
+from jarvis_lazy import lazy_module, prewarm, profile_startup
+
+# ------------------ Modulok (lusta betöltés) ------------------
+# A nehéz függőségek (whisper/torch, cv2/ultralytics, pyvista/matplotlib)
+# csak első használatkor vagy a háttérben töltődnek be, így az ablak azonnal megjelenik
+boot = lazy_module("jarvis_boot")                  # Boot GUI
+ui = lazy_module("jarvis_ui")                      # GUI + TTS + animált fej
+materials = lazy_module("jarvis_3d_advanced")      # 3D anyag generálás
+vision = lazy_module("jarvis_vision")              # Kamera + objektumfelismerés
+logic = lazy_module("jarvis_logic")                # Ollama, keresés, eszközök
+voice = lazy_module("jarvis_voice_recognition")    # Whisper beszédfelismerés
+
+# --profile-startup sorrend: ami az ablak előtt kell, aztán a háttérben betöltöttek
+STARTUP_MODULES = ["jarvis_ui", "jarvis_logic", "jarvis_voice_recognition", "jarvis_vision", "jarvis_3d_advanced"]
+WINDOW_MODULES = ["jarvis_ui"]
+
+def generate_material_preview(*args, **kwargs):
+    """3D anyag előnézet (a pyvista/matplotlib csak itt töltődik be)"""
+    return materials.generate_material_preview(*args, **kwargs)
+
+def speak(text):
+    return ui.speak(text)
+
+def start_vision():
+    """Objektumfelismerés; a cv2/ultralytics importja ezen a szálon történik"""
+    try:
+        vision.start_vision()
+    except Exception as e:
+        print(f"⚠ Kamera modul nem indul: {e}")
+
+def start_backend():
+    """Ollama modell előtöltés és metrikák (a jarvis_logic betöltése után)"""
+    logic.start_model_lifecycle()
+    logic.start_metrics_listener()
 
 # ------------------ Fő futtató függvény ------------------
 def run_all():
     # 1️⃣ Boot GUI elindítása külön szálon
-   # boot_thread = threading.Thread(target=boot_main, daemon=True)
+   # boot_thread = threading.Thread(target=boot.main, daemon=True)
    # boot_thread.start()
 
     # 2️⃣ Várunk, amíg a boot lefut (kb. 3 másodperc)
@@ -26,12 +55,26 @@ def run_all():
     #    daemon=True
     #).start()
 
-    # 6️⃣ Háttér objektumfelismerés kamera használatával
+    # Az ablakhoz csak a jarvis_ui kell: először ez töltődik be, a többi a háttérben
+    ui.load()
+
+    # 3️⃣ Háttérben: jarvis_logic + Ollama modell betöltése (az első kérdés ne várjon rá),
+    # utána a whisper modul, hogy az első felvétel se várjon
+    prewarm(logic, start_backend, voice)
+
+    # 6️⃣ Háttér objektumfelismerés kamera használatával (cv2/YOLO a saját szálán töltődik be)
     threading.Thread(target=start_vision, daemon=True).start()
 
     ## 7️⃣ GUI fő loop
-    main()
+    ui.main()
 
 # ------------------ Belépési pont ------------------
 if __name__ == "__main__":
-    run_all()
+    parser = argparse.ArgumentParser(description="JARVIS AI Assistant")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print per-module import time and RSS, then exit")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup(STARTUP_MODULES, critical=WINDOW_MODULES)
+    else:
+        run_all()
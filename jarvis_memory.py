@@ -0,0 +1,191 @@
+# jarvis_memory.py
+# Long-term memory: append-only memory-mapped embedding matrix with top-k recall
+import json
+import os
+import threading
+from pathlib import Path
+
+# ------------------ NumPy Import ------------------
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    np = None
+
+# ------------------ Memory Index ------------------
+class MemoryIndex:
+    """
+    Conversation turns -> L2-normalized float32 embeddings.
+
+    Files in `directory`:
+    - vectors.f32  rows of `dim` float32 values, only ever appended
+    - index.jsonl  one line per row: {"row", "turn_id", "answer_id", "session"},
+                   the vector of a row starts at byte row * dim * 4
+    - meta.json    embedding model, dim and the last indexed message id
+
+    Lookups memory-map vectors.f32 (remapped when it grows), so recall is
+    one matrix-vector product without loading the file into RAM.
+    """
+
+    def __init__(self, directory):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("MemoryIndex needs NumPy (pip install numpy)")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.index_path = self.directory / "index.jsonl"
+        self.meta_path = self.directory / "meta.json"
+        self._lock = threading.RLock()
+        self._map = None
+        self._session_array = None
+        self._turn_array = None
+        self.model = None
+        self.dim = 0
+        self.last_id = 0
+        self.turn_ids = []
+        self.answer_ids = []
+        self.sessions = []
+        self.load()
+
+    # ------------------ Persistence ------------------
+    def load(self):
+        """Read meta and index, dropping rows a crash left half-written"""
+        with self._lock:
+            try:
+                if self.meta_path.exists():
+                    meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+                    self.model = meta.get("model")
+                    self.dim = meta.get("dim", 0)
+                    self.last_id = meta.get("last_id", 0)
+                if self.index_path.exists():
+                    with open(self.index_path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            try:
+                                entry = json.loads(line)
+                            except ValueError:
+                                break
+                            self.turn_ids.append(entry["turn_id"])
+                            self.answer_ids.append(entry["answer_id"])
+                            self.sessions.append(entry["session"])
+            except Exception as e:
+                print(f"⚠ Memory index load error: {e}")
+                self._reset_files()
+                return
+
+            rows_on_disk = self.vectors_path.stat().st_size // (self.dim * 4) if self.dim and self.vectors_path.exists() else 0
+            rows = min(rows_on_disk, len(self.turn_ids))
+            if rows < len(self.turn_ids) or rows < rows_on_disk:
+                del self.turn_ids[rows:], self.answer_ids[rows:], self.sessions[rows:]
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(rows * self.dim * 4)
+                self._rewrite_index()
+            if self.turn_ids:
+                self.last_id = max(self.last_id, self.answer_ids[-1])
+
+    def _save_meta(self):
+        tmp_path = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"model": self.model, "dim": self.dim, "last_id": self.last_id}), encoding="utf-8")
+        os.replace(tmp_path, self.meta_path)
+
+    def _rewrite_index(self):
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            for row, entry in enumerate(zip(self.turn_ids, self.answer_ids, self.sessions)):
+                f.write(json.dumps({"row": row, "turn_id": entry[0], "answer_id": entry[1], "session": entry[2]}) + "\n")
+
+    def _reset_files(self):
+        self._map = None
+        self.turn_ids, self.answer_ids, self.sessions = [], [], []
+        self.model, self.dim, self.last_id = None, 0, 0
+        for path in (self.vectors_path, self.index_path, self.meta_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ------------------ Indexing ------------------
+    def ensure_model(self, model):
+        """Start over if the embedding model changed (old vectors are not comparable)"""
+        with self._lock:
+            if self.model is not None and self.model != model:
+                print(f"🧠 Embedding model changed ({self.model} -> {model}), rebuilding memory index")
+                self._reset_files()
+            self.model = model
+
+    def add(self, turns, vectors, last_id):
+        """
+        Append embedded turns: turns is a list of (turn_id, answer_id, session),
+        vectors a matching list of embeddings. last_id marks everything up to it as indexed.
+        """
+        with self._lock:
+            if turns:
+                matrix = np.asarray(vectors, dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix /= np.where(norms == 0, 1, norms)
+                if not self.dim:
+                    self.dim = matrix.shape[1]
+                if matrix.shape[1] != self.dim:
+                    raise ValueError(f"Embedding size {matrix.shape[1]} != index size {self.dim}")
+
+                with open(self.vectors_path, "ab") as f:
+                    f.write(matrix.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                with open(self.index_path, "a", encoding="utf-8") as f:
+                    for turn_id, answer_id, session in turns:
+                        row = len(self.turn_ids)
+                        f.write(json.dumps({"row": row, "turn_id": turn_id, "answer_id": answer_id, "session": session}) + "\n")
+                        self.turn_ids.append(turn_id)
+                        self.answer_ids.append(answer_id)
+                        self.sessions.append(session)
+            self.last_id = max(self.last_id, last_id)
+            self._save_meta()
+
+    # ------------------ Recall ------------------
+    def _matrix(self):
+        """Memory-mapped (rows, dim) view, remapped after appends (lock must be held)"""
+        rows = len(self.turn_ids)
+        if not rows:
+            return None
+        if self._map is None or self._map.shape[0] != rows:
+            self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+            self._session_array = np.array(self.sessions)
+            self._turn_array = np.array(self.turn_ids)
+        return self._map
+
+    def search(self, vector, k=3, session=None, before_id=None, min_score=0.0):
+        """
+        Top-k most similar turns as (turn_id, answer_id, score), best first.
+        Only turns of `session` (if given) and with turn_id < before_id (if given).
+        """
+        query = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        with self._lock:
+            matrix = self._matrix()
+            if matrix is None or query.shape[0] != self.dim or not norm:
+                return []
+            scores = matrix @ (query / norm)
+            if session is not None or before_id is not None:
+                mask = np.ones(len(scores), dtype=bool)
+                if session is not None:
+                    mask &= self._session_array == session
+                if before_id is not None:
+                    mask &= self._turn_array < before_id
+                scores = np.where(mask, scores, -np.inf)
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (self.turn_ids[row], self.answer_ids[row], float(scores[row]))
+                for row in top if scores[row] >= min_score
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "turns": len(self.turn_ids),
+                "dim": self.dim,
+                "model": self.model,
+                "last_id": self.last_id,
+                "bytes": len(self.turn_ids) * self.dim * 4
+            }
@@ -0,0 +1,295 @@
+# jarvis_metrics.py
+# Per-stage latency and token metrics for askAI turns (Prometheus text + JSON snapshot)
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ------------------ Settings ------------------
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9464
+RECENT_TURNS = 50   # Per-turn breakdowns kept for the JSON snapshot
+
+# Histogram buckets (seconds / tokens per second / iterations)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 400)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 8)
+SCORE_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10)
+
+# ------------------ Metric Types ------------------
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6)
+        }
+
+def escape_label(value):
+    """Label value escaped per the Prometheus text exposition format"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (name, sorted labels), thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}     # (name, labels) -> float
+        self.histograms = {}   # (name, labels) -> Histogram
+        self.help = {}         # name -> (type, help text)
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self.counters} | {name for name, _ in self.histograms})
+            for name in names:
+                kind, text = self.help.get(name, ("untyped", ""))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{label_text(labels)} {value:g}")
+                for (metric, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{label_text(labels + (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{label_text(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{label_text(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            histograms = {}
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                histograms.setdefault(name, []).append({"labels": dict(labels), **histogram.snapshot()})
+        return {"counters": counters, "histograms": histograms}
+
+# ------------------ Turn Tracking ------------------
+class TurnMetrics:
+    """Breakdown of one askAI turn: spans, model round trips and loop iterations"""
+
+    def __init__(self, session_id):
+        self.session = session_id
+        self.started = time.time()
+        self.stages = {}       # stage -> total seconds
+        self.model_calls = []  # per round trip token/timing info
+        self.iterations = 0
+        self.route = None      # Model tier chosen by the router (and escalations)
+        self.outcome = "unknown"
+        self.duration = 0.0
+
+    def add_stage(self, stage, elapsed):
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+
+    def to_dict(self):
+        return {
+            "session": self.session,
+            "started": self.started,
+            "duration_s": round(self.duration, 6),
+            "outcome": self.outcome,
+            "iterations": self.iterations,
+            "route": self.route,
+            "stages_s": {stage: round(elapsed, 6) for stage, elapsed in self.stages.items()},
+            "model_calls": self.model_calls
+        }
+
+_current_turn = contextvars.ContextVar("jarvis_turn", default=None)
+
+registry = MetricsRegistry()
+registry.describe("jarvis_stage_seconds", "histogram", "Time spent per pipeline stage")
+registry.describe("jarvis_turn_seconds", "histogram", "Wall time of a whole askAI turn")
+registry.describe("jarvis_turns_total", "counter", "Finished askAI turns by outcome")
+registry.describe("jarvis_turn_iterations", "histogram", "Model round trips per turn")
+registry.describe("jarvis_model_calls_total", "counter", "Ollama round trips")
+registry.describe("jarvis_prompt_tokens_total", "counter", "Prompt tokens evaluated by Ollama")
+registry.describe("jarvis_completion_tokens_total", "counter", "Tokens generated by Ollama")
+registry.describe("jarvis_prefill_seconds", "histogram", "Prompt evaluation (prefill) time per round trip")
+registry.describe("jarvis_decode_tokens_per_second", "histogram", "Generation speed per round trip")
+registry.describe("jarvis_search_attempts_total", "counter", "Web search attempts by result")
+registry.describe("jarvis_tool_calls_total", "counter", "Tool calls by tool and result")
+registry.describe("jarvis_route_total", "counter", "Turns routed per model tier")
+registry.describe("jarvis_route_score", "histogram", "Complexity score of routed turns per tier")
+registry.describe("jarvis_tier_seconds", "histogram", "Model round trip time per tier")
+registry.describe("jarvis_tier_turn_seconds", "histogram", "Wall time of turns per final model tier")
+registry.describe("jarvis_escalations_total", "counter", "Turns moved to a larger tier after failed validation")
+
+_recent_turns = deque(maxlen=RECENT_TURNS)
+_recent_lock = threading.Lock()
+
+def current_turn():
+    """The TurnMetrics of the running askAI turn (None outside a turn)"""
+    return _current_turn.get()
+
+@contextmanager
+def turn(session_id):
+    """Track one askAI turn; spans inside it are added to its breakdown"""
+    record = TurnMetrics(session_id)
+    token = _current_turn.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.duration = time.perf_counter() - start
+        _current_turn.reset(token)
+        registry.observe("jarvis_turn_seconds", record.duration)
+        registry.inc("jarvis_turns_total", outcome=record.outcome)
+        registry.observe("jarvis_turn_iterations", record.iterations, ITERATION_BUCKETS)
+        if record.route:
+            registry.observe("jarvis_tier_turn_seconds", record.duration, tier=record.route["tier"])
+        with _recent_lock:
+            _recent_turns.append(record.to_dict())
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage (works around awaits inside coroutines too)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("jarvis_stage_seconds", elapsed, stage=stage)
+        record = _current_turn.get()
+        if record is not None:
+            record.add_stage(stage, elapsed)
+
+def record_model_call(model, final_chunk=None, streamed_chunks=0, elapsed=0.0):
+    """
+    Token accounting of one Ollama round trip. Ollama reports counts and
+    nanosecond durations in the final chunk; when the stream was cut off
+    early (TOOL/SEARCH marker) the streamed chunk count stands in.
+    """
+    info = {"model": model, "elapsed_s": round(elapsed, 6), "complete": final_chunk is not None}
+    if final_chunk is not None:
+        prompt_tokens = final_chunk.get("prompt_eval_count") or 0
+        completion_tokens = final_chunk.get("eval_count") or 0
+        prefill = (final_chunk.get("prompt_eval_duration") or 0) / 1e9
+        decode = (final_chunk.get("eval_duration") or 0) / 1e9
+        info.update({
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "prefill_s": round(prefill, 6),
+            "load_s": round((final_chunk.get("load_duration") or 0) / 1e9, 6)
+        })
+        registry.inc("jarvis_prompt_tokens_total", prompt_tokens, model=model)
+        if prefill:
+            registry.observe("jarvis_prefill_seconds", prefill, model=model)
+        if decode and completion_tokens:
+            info["tokens_per_second"] = round(completion_tokens / decode, 2)
+            registry.observe("jarvis_decode_tokens_per_second", completion_tokens / decode, RATE_BUCKETS, model=model)
+    else:
+        completion_tokens = streamed_chunks
+        info["completion_tokens"] = completion_tokens
+    registry.inc("jarvis_completion_tokens_total", completion_tokens, model=model)
+    registry.inc("jarvis_model_calls_total", model=model, complete=str(final_chunk is not None).lower())
+    record = _current_turn.get()
+    if record is not None:
+        record.model_calls.append(info)
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    registry.observe(name, value, buckets, **labels)
+
+# ------------------ Export ------------------
+def snapshot():
+    """JSON-serializable snapshot: all counters/histograms plus the recent turns"""
+    with _recent_lock:
+        recent = list(_recent_turns)
+    return {"time": time.time(), **registry.snapshot(), "recent_turns": recent}
+
+def render_prometheus():
+    return registry.render_prometheus()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics (Prometheus text) and GET /metrics.json (the server's snapshot_source())"""
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(self.server.snapshot_source(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+_metrics_server = None
+
+def start_metrics_server(host=DEFAULT_METRICS_HOST, port=DEFAULT_METRICS_PORT, snapshot_source=snapshot):
+    """
+    Serve /metrics and /metrics.json from a daemon thread (once).
+    snapshot_source builds the JSON (jarvis_logic adds scheduler/cache/tool stats).
+    """
+    global _metrics_server
+    if _metrics_server is not None:
+        return _metrics_server
+    try:
+        _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠ Metrics listener not started on {host}:{port}: {e}")
+        return None
+    _metrics_server.daemon_threads = True
+    _metrics_server.snapshot_source = snapshot_source
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True, name="jarvis-metrics").start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return _metrics_server
@@ -0,0 +1,136 @@
+# jarvis_rank.py
+# BM25 sentence ranking and token-capped pruning of web search results
+import math
+import re
+from collections import Counter
+
+# ------------------ NumPy Import (optional, vectorized scoring) ------------------
+NUMPY_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    np = None
+
+# ------------------ Settings ------------------
+BM25_K1 = 1.5
+BM25_B = 0.75
+DUPLICATE_SIMILARITY = 0.8   # Word-set Jaccard above which two snippets count as the same
+MIN_SENTENCE_CHARS = 20      # Shorter fragments ("Read more.") are dropped
+RANK_PRIOR = 0.01            # Tie-breaker: earlier results and sentences win
+
+WORD_PATTERN = re.compile(r'\w+')
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+|\s*(?:\.\.\.|…)\s*|\n+')
+
+def tokenize(text):
+    return WORD_PATTERN.findall(text.lower())
+
+def split_sentences(text):
+    """Split a snippet into sentences, dropping very short fragments"""
+    sentences = (s.strip() for s in SENTENCE_PATTERN.split(text or ""))
+    return [s for s in sentences if len(s) >= MIN_SENTENCE_CHARS]
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+# ------------------ BM25 ------------------
+def bm25_scores(query_terms, documents, k1=BM25_K1, b=BM25_B):
+    """
+    BM25 score of every tokenized document against the query terms
+    Returns a list of floats (one per document)
+    """
+    query_terms = list(dict.fromkeys(query_terms))
+    if not documents or not query_terms:
+        return [0.0] * len(documents)
+
+    counts = [Counter(doc) for doc in documents]
+    lengths = [len(doc) for doc in documents]
+    avg_length = (sum(lengths) / len(lengths)) or 1.0
+    n = len(documents)
+    doc_freq = [sum(1 for c in counts if term in c) for term in query_terms]
+    idf = [math.log(1 + (n - df + 0.5) / (df + 0.5)) for df in doc_freq]
+
+    if NUMPY_AVAILABLE:
+        # (documents x query terms) term frequency matrix, scored in one pass
+        tf = np.array([[c[term] for term in query_terms] for c in counts], dtype=float)
+        norm = k1 * (1 - b + b * np.array(lengths, dtype=float) / avg_length)
+        scores = (tf * (k1 + 1) / (tf + norm[:, None])) @ np.array(idf)
+        return scores.tolist()
+
+    scores = []
+    for c, length in zip(counts, lengths):
+        norm = k1 * (1 - b + b * length / avg_length)
+        scores.append(sum(
+            weight * c[term] * (k1 + 1) / (c[term] + norm)
+            for term, weight in zip(query_terms, idf) if c[term]
+        ))
+    return scores
+
+# ------------------ Pruning ------------------
+def dedupe_results(results):
+    """Drop results whose snippet is near-identical to an earlier one"""
+    kept = []
+    seen = []
+    for r in results:
+        words = set(tokenize(f"{r.get('title', '')} {r.get('body', '')}"))
+        if any(jaccard(words, other) >= DUPLICATE_SIMILARITY for other in seen):
+            continue
+        seen.append(words)
+        kept.append(r)
+    return kept
+
+def estimate_block_tokens(text):
+    return len(text) // 4 + 1
+
+def prune_search_results(results, question, max_tokens, count_tokens=estimate_block_tokens):
+    """
+    Keep only the sentences most relevant to the question within max_tokens.
+    Returns result dicts (same keys, source order kept) whose body holds the
+    selected sentences in their original order; sources without a selected
+    sentence are left out.
+    """
+    results = dedupe_results(results)
+
+    # (result index, sentence index, sentence) candidates, near-duplicates dropped
+    candidates = []
+    seen = []
+    for i, r in enumerate(results):
+        for j, sentence in enumerate(split_sentences(r.get('body', ''))):
+            words = set(tokenize(sentence))
+            if any(jaccard(words, other) >= DUPLICATE_SIMILARITY for other in seen):
+                continue
+            seen.append(words)
+            candidates.append((i, j, sentence))
+    if not candidates:
+        return []
+
+    # Title words count for every sentence of the source
+    documents = [tokenize(f"{results[i].get('title', '')} {sentence}") for i, _, sentence in candidates]
+    scores = bm25_scores(tokenize(question), documents)
+    ranked = sorted(
+        range(len(candidates)),
+        key=lambda k: scores[k] - RANK_PRIOR * (candidates[k][0] + candidates[k][1]),
+        reverse=True
+    )
+
+    # Greedy fill: a source costs its header/URL once, then each sentence
+    selected = {}
+    used = 0
+    for k in ranked:
+        i, j, sentence = candidates[k]
+        cost = count_tokens(sentence)
+        if i not in selected:
+            r = results[i]
+            cost += count_tokens(f"[Source 00] {r.get('title', '')}\nURL: {r.get('href', '')}")
+        if used + cost > max_tokens:
+            continue
+        used += cost
+        selected.setdefault(i, []).append((j, sentence))
+
+    pruned = []
+    for i in sorted(selected):
+        body = " ".join(sentence for _, sentence in sorted(selected[i]))
+        pruned.append({**results[i], 'body': body})
+    return pruned
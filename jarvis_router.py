@@ -0,0 +1,99 @@
+# jarvis_router.py
+# Complexity-based routing of askAI turns across a tier list of Ollama models
+import re
+
+# ------------------ Scoring ------------------
+LONG_INPUT_WORDS = 25     # +2 above this many words
+MEDIUM_INPUT_WORDS = 12   # +1 above this many words
+
+COMPLEX_PATTERN = re.compile(
+    r'\b(?:compare|comparison|versus|vs|explain|analy[sz]e|why|pros and cons|difference|'
+    r'step by step|in detail|summari[sz]e|write|code|implement|debug|plan|'
+    r'hasonlítsd|összehasonlít\w*|magyarázd|elemezd|miért|különbség\w*|részletesen|írj)\b'
+)
+TOOL_HINT_PATTERN = re.compile(
+    r'\d\s*[-+*/^×÷]\s*\d|\b(?:calculate|time|date|today|day|szám\w*|idő|dátum|hány óra)\b'
+)
+CODE_PATTERN = re.compile(r'```|\bdef |\bclass |\bfunction\b|[{};]\s*$', re.MULTILINE)
+
+def complexity_score(user_input, search_trigger=False):
+    """
+    Cheap complexity estimate of a turn (0 = trivial):
+    length, auto-search trigger hit, tool likelihood, question count,
+    reasoning keywords and code
+    """
+    text = user_input.lower()
+    words = len(text.split())
+    score = 0
+    if words > LONG_INPUT_WORDS:
+        score += 2
+    elif words > MEDIUM_INPUT_WORDS:
+        score += 1
+    if search_trigger:
+        score += 2
+    if TOOL_HINT_PATTERN.search(text):
+        score += 1
+    if text.count("?") > 1:
+        score += 1
+    if COMPLEX_PATTERN.search(text):
+        score += 2
+    if CODE_PATTERN.search(user_input):
+        score += 2
+    return score
+
+# ------------------ Tiers ------------------
+def model_tiers(config):
+    """
+    Tier list from config ("model_tiers": [{"name", "model", "max_score"}...],
+    fastest first). Without it there is one tier with the configured model.
+    """
+    tiers = config.get("model_tiers") or []
+    result = []
+    for i, tier in enumerate(tiers):
+        if isinstance(tier, str):
+            tier = {"model": tier}
+        if not tier.get("model"):
+            continue
+        result.append({
+            "name": str(tier.get("name") or f"tier{i}"),
+            "model": tier["model"],
+            "max_score": tier.get("max_score")
+        })
+    if not result:
+        result = [{"name": "default", "model": config.get("model", "llama3.2"), "max_score": None}]
+    return result
+
+def select_tier(tiers, score):
+    """Index of the first tier whose max_score covers the score (the last tier takes the rest)"""
+    for i, tier in enumerate(tiers[:-1]):
+        if tier["max_score"] is not None and score <= tier["max_score"]:
+            return i
+    return len(tiers) - 1
+
+# ------------------ Output Validation ------------------
+UNCERTAIN_PATTERN = re.compile(
+    r"\b(?:i (?:don't|do not) (?:know|understand)|i'm not sure|i am not sure|as an ai\b|"
+    r"i cannot (?:help|answer)|nem tudom|nem értem)",
+    re.IGNORECASE
+)
+UNCLOSED_MARKER_PATTERN = re.compile(r'\b(?:TOOL|SEARCH)\(\s*"[^")]*$')
+MIN_REPETITION_TOKENS = 40
+MIN_UNIQUE_RATIO = 0.3
+
+def validate_output(text):
+    """
+    Reason the small model's answer is unusable, or None if it looks fine:
+    empty, a broken TOOL/SEARCH marker, degenerate repetition or an
+    "I don't know" style non-answer
+    """
+    stripped = text.strip()
+    if not stripped:
+        return "empty"
+    if UNCLOSED_MARKER_PATTERN.search(stripped):
+        return "broken_marker"
+    tokens = stripped.lower().split()
+    if len(tokens) >= MIN_REPETITION_TOKENS and len(set(tokens)) / len(tokens) < MIN_UNIQUE_RATIO:
+        return "repetition"
+    if UNCERTAIN_PATTERN.search(stripped) and len(tokens) < MIN_REPETITION_TOKENS:
+        return "uncertain"
+    return None
@@ -0,0 +1,231 @@
+# jarvis_scheduler.py
+# Priority scheduler shared by every Ollama call (sync threads and asyncio tasks)
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+# ------------------ Priority Classes ------------------
+INTERACTIVE = "interactive"       # First generation of a user turn, prompt embeddings
+TOOL_FOLLOWUP = "tool_followup"   # Generations after a TOOL()/SEARCH() result
+BACKGROUND = "background"         # Summaries, scene descriptions, warm-up, memory indexing
+
+PRIORITY_ORDER = [INTERACTIVE, TOOL_FOLLOWUP, BACKGROUND]
+
+MAX_CONCURRENT = 2   # Ollama calls running at the same time (all classes)
+CLASS_LIMITS = {
+    INTERACTIVE: 2,
+    TOOL_FOLLOWUP: 2,
+    BACKGROUND: 1,
+}
+MAX_BACKGROUND_DEFER = 30.0  # Seconds background work waits for user turns before it runs anyway
+
+class _Ticket:
+    """One waiting request; `grant` wakes the waiter (thread event or asyncio future)"""
+    __slots__ = ("priority", "enqueued", "granted", "grant", "deferred")
+
+    def __init__(self, priority, grant):
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.granted = False
+        self.grant = grant
+        self.deferred = False
+
+# ------------------ Scheduler ------------------
+class OllamaScheduler:
+    """
+    Grants Ollama slots by priority class (FIFO within a class), limited per
+    class and in total. Background work is deferred while any user turn is
+    active, so a scene description never sits in front of a question.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT, class_limits=None, max_defer=MAX_BACKGROUND_DEFER):
+        self.max_concurrent = max_concurrent
+        self.max_defer = max_defer
+        self.class_limits = dict(CLASS_LIMITS, **(class_limits or {}))
+        self._lock = threading.Lock()
+        self._waiting = {name: [] for name in PRIORITY_ORDER}
+        self._running = {name: 0 for name in PRIORITY_ORDER}
+        self.active_turns = 0
+        self._metrics = {
+            name: {"granted": 0, "deferred": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for name in PRIORITY_ORDER
+        }
+
+    # ------------------ Dispatch ------------------
+    def _eligible(self, ticket):
+        if self._running[ticket.priority] >= self.class_limits[ticket.priority]:
+            return False
+        if ticket.priority == BACKGROUND and self.active_turns:
+            ticket.deferred = True
+            return time.perf_counter() - ticket.enqueued >= self.max_defer
+        return True
+
+    def _dispatch(self):
+        """Grant as many waiting tickets as the limits allow (lock must be held)"""
+        while sum(self._running.values()) < self.max_concurrent:
+            ticket = None
+            for priority in PRIORITY_ORDER:
+                queue = self._waiting[priority]
+                if not queue:
+                    continue
+                if self._eligible(queue[0]):
+                    ticket = queue.pop(0)
+                    break
+            if ticket is None:
+                return
+            self._running[ticket.priority] += 1
+            ticket.granted = True
+            waited = time.perf_counter() - ticket.enqueued
+            metrics = self._metrics[ticket.priority]
+            metrics["granted"] += 1
+            metrics["wait_total"] += waited
+            metrics["wait_max"] = max(metrics["wait_max"], waited)
+            if ticket.deferred:
+                metrics["deferred"] += 1
+            ticket.grant()
+
+    def _enqueue(self, priority, grant):
+        if priority not in self._waiting:
+            raise ValueError(f"Unknown priority class: {priority}")
+        ticket = _Ticket(priority, grant)
+        with self._lock:
+            self._waiting[priority].append(ticket)
+            self._dispatch()
+        return ticket
+
+    def release(self, priority):
+        with self._lock:
+            self._running[priority] -= 1
+            self._dispatch()
+
+    # ------------------ Sync API ------------------
+    @contextmanager
+    def slot(self, priority):
+        """Blocking: `with scheduler.slot(BACKGROUND): ollama.generate(...)`"""
+        event = threading.Event()
+        self._enqueue(priority, event.set)
+        event.wait()
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    # ------------------ Async API ------------------
+    @asynccontextmanager
+    async def slot_async(self, priority):
+        """Awaitable: `async with scheduler.slot_async(INTERACTIVE): ...`"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+
+        ticket = self._enqueue(priority, grant)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if not ticket.granted:
+                    self._waiting[priority].remove(ticket)
+                    raise
+            self.release(priority)
+            raise
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    # ------------------ User Turns ------------------
+    def begin_turn(self):
+        with self._lock:
+            self.active_turns += 1
+
+    def end_turn(self):
+        with self._lock:
+            self.active_turns -= 1
+            self._dispatch()
+
+    @asynccontextmanager
+    async def user_turn(self):
+        """Marks a user turn as active (background work waits until it ends)"""
+        self.begin_turn()
+        try:
+            yield
+        finally:
+            self.end_turn()
+
+    # ------------------ Metrics ------------------
+    def stats(self):
+        """Queue depth, running calls and wait times per priority class"""
+        now = time.perf_counter()
+        with self._lock:
+            classes = {}
+            for name in PRIORITY_ORDER:
+                metrics = self._metrics[name]
+                waiting = self._waiting[name]
+                classes[name] = {
+                    "running": self._running[name],
+                    "limit": self.class_limits[name],
+                    "queued": len(waiting),
+                    "oldest_wait_ms": round((now - waiting[0].enqueued) * 1000, 1) if waiting else 0.0,
+                    "granted": metrics["granted"],
+                    "deferred": metrics["deferred"],
+                    "avg_wait_ms": round(metrics["wait_total"] * 1000 / metrics["granted"], 1) if metrics["granted"] else 0.0,
+                    "max_wait_ms": round(metrics["wait_max"] * 1000, 1)
+                }
+            return {
+                "max_concurrent": self.max_concurrent,
+                "active_turns": self.active_turns,
+                "classes": classes
+            }
+
+# ------------------ Cancellation ------------------
+class CancelToken:
+    """
+    Stop signal for a running askAI turn, usable from any thread (UI stop
+    button, server request). cancel() cancels the turn's asyncio task: the
+    Ollama stream is closed (so the server stops generating), the scheduler
+    slot is released and pending searches are dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._task = None
+        self._loop = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return  # One cancel per turn, askAI_async uncancels exactly once
+            self._cancelled = True
+            task, loop = self._task, self._loop
+        if task is not None:
+            loop.call_soon_threadsafe(self._cancel_task, task)
+
+    def _cancel_task(self, task):
+        # Runs on the loop: the turn may have ended (and the task moved on to
+        # other work) between cancel() and this callback
+        with self._lock:
+            if self._task is not task:
+                return
+        task.cancel()
+
+    def bind(self, task):
+        """Attach the task running the turn (cancelled right away if cancel() came first)"""
+        with self._lock:
+            self._task = task
+            self._loop = asyncio.get_running_loop()
+            cancelled = self._cancelled
+        if cancelled:
+            task.cancel()
+
+    def unbind(self):
+        with self._lock:
+            self._task = None
+            self._loop = None
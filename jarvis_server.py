@@ -0,0 +1,267 @@
+# jarvis_server.py
+# Multi-session HTTP/WebSocket server for jarvis_logic.askAI
+import argparse
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+
+# ------------------ aiohttp Import ------------------
+AIOHTTP_AVAILABLE = False
+try:
+    from aiohttp import web, WSMsgType
+    AIOHTTP_AVAILABLE = True
+except Exception as e:
+    print(f"⚠ Server mode not available: {e}")
+    print("Install with: pip install aiohttp")
+
+from jarvis_logic import (
+    CancelToken, askAI_async, clear_history, close_async_client, get_ai_status, get_metrics_snapshot,
+    get_scheduler_stats, load_history, start_metrics_listener, start_model_lifecycle
+)
+from jarvis_metrics import render_prometheus
+
+# ------------------ Configuration ------------------
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_CONCURRENT = 2   # Generations running against Ollama at the same time
+MAX_QUEUE = 8        # Requests allowed to wait for a free slot
+RETRY_AFTER = 5      # Seconds suggested to rejected clients
+
+# ------------------ Admission Control ------------------
+class ServerBusy(Exception):
+    """Raised when both the running slots and the wait queue are full"""
+
+class AdmissionController:
+    """
+    Bounded concurrency toward Ollama: at most `max_concurrent` turns run,
+    at most `max_queue` more wait; anything beyond that is rejected.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.pending = 0   # running + waiting
+        self.rejected = 0
+
+    def stats(self):
+        running = min(self.pending, self.max_concurrent)
+        return {
+            "running": running,
+            "waiting": self.pending - running,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected
+        }
+
+    async def run(self, coro):
+        """Run a coroutine in a slot, or raise ServerBusy without starting it"""
+        if self.pending >= self.max_concurrent + self.max_queue:
+            self.rejected += 1
+            coro.close()
+            raise ServerBusy()
+
+        self.pending += 1
+        try:
+            async with self.semaphore:
+                return await coro
+        finally:
+            self.pending -= 1
+
+# ------------------ Jarvis Server ------------------
+class JarvisServer:
+    def __init__(self, max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE):
+        self.admission = AdmissionController(max_concurrent, max_queue)
+        self.session_locks = {}  # session -> [lock, holders + waiters]; turns of one session never run concurrently
+        self.cancel_tokens = {}  # session -> tokens of its running/queued turns
+
+    @asynccontextmanager
+    async def session_lock(self, session_id):
+        """Hold the session's lock; it is dropped once nobody holds or waits for it"""
+        entry = self.session_locks.get(session_id)
+        if entry is None:
+            entry = self.session_locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                self.session_locks.pop(session_id, None)
+
+    async def ask(self, session_id, message, stream_callback=None):
+        """One askAI turn for a session, subject to admission control (stoppable via cancel())"""
+        # Same-session turns queue on the session lock, not in an admission
+        # slot, so one client can't fill the server with its own backlog
+        entry = self.session_locks.get(session_id)
+        if entry is not None and entry[1] > self.admission.max_queue:
+            self.admission.rejected += 1
+            raise ServerBusy()
+
+        token = CancelToken()
+        tokens = self.cancel_tokens.setdefault(session_id, set())
+        tokens.add(token)
+        try:
+            async with self.session_lock(session_id):
+                return await self.admission.run(askAI_async(message, stream_callback, session_id, token))
+        finally:
+            tokens.discard(token)
+            if not tokens:
+                self.cancel_tokens.pop(session_id, None)
+
+    def cancel(self, session_id):
+        """Stop the running and queued turns of a session, returns how many were stopped"""
+        tokens = self.cancel_tokens.get(session_id, ())
+        for token in tokens:
+            token.cancel()
+        return len(tokens)
+
+    # ------------------ HTTP Handlers ------------------
+    async def handle_chat(self, request):
+        """POST /chat {"message": "...", "session": "..."} -> {"session", "response"}"""
+        try:
+            data = await request.json()
+        except Exception:
+            return web.json_response({"error": "Invalid JSON"}, status=400)
+
+        message = str(data.get("message", "")).strip()
+        if not message:
+            return web.json_response({"error": "Empty message"}, status=400)
+        session_id = str(data.get("session") or uuid.uuid4().hex)
+
+        try:
+            response = await self.ask(session_id, message)
+        except ServerBusy:
+            return web.json_response(
+                {"error": "Server busy, try again later"},
+                status=429,
+                headers={"Retry-After": str(RETRY_AFTER)}
+            )
+        return web.json_response({"session": session_id, "response": response})
+
+    async def handle_history(self, request):
+        """GET /sessions/{session}/history"""
+        session_id = request.match_info["session"]
+        history = [m for m in load_history(session_id) if m["role"] != "system"]
+        return web.json_response({"session": session_id, "history": history})
+
+    async def handle_cancel(self, request):
+        """POST /sessions/{session}/cancel - stop generating (the partial answer is kept)"""
+        session_id = request.match_info["session"]
+        return web.json_response({"session": session_id, "cancelled": self.cancel(session_id)})
+
+    async def handle_clear(self, request):
+        """DELETE /sessions/{session}"""
+        session_id = request.match_info["session"]
+        async with self.session_lock(session_id):
+            clear_history(session_id)
+        return web.json_response({"session": session_id, "cleared": True})
+
+    async def handle_status(self, request):
+        """GET /status"""
+        return web.json_response({
+            "ai": get_ai_status(),
+            "load": self.admission.stats(),
+            "ollama": get_scheduler_stats()
+        })
+
+    async def handle_metrics(self, request):
+        """GET /metrics (Prometheus text format)"""
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def handle_metrics_json(self, request):
+        """GET /metrics.json"""
+        return web.json_response({**get_metrics_snapshot(), "load": self.admission.stats()})
+
+    # ------------------ WebSocket Handler ------------------
+    async def handle_ws(self, request):
+        """
+        GET /ws?session=... - send {"message": "..."} (or plain text),
+        receive {"type": "token"} frames, then {"type": "done"} or {"type": "error"};
+        POST /sessions/{session}/cancel stops the running turn
+        """
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        session_id = request.query.get("session") or uuid.uuid4().hex
+        await ws.send_json({"type": "session", "session": session_id})
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                if msg.type == WSMsgType.ERROR:
+                    print(f"⚠ WebSocket error: {ws.exception()}")
+                continue
+
+            try:
+                message = str(json.loads(msg.data).get("message", "")).strip()
+            except (ValueError, AttributeError):
+                message = msg.data.strip()
+            if not message:
+                await ws.send_json({"type": "error", "status": 400, "error": "Empty message"})
+                continue
+
+            # Tokens come from a sync callback, a sender task forwards them in order
+            tokens = asyncio.Queue()
+
+            async def forward_tokens():
+                while True:
+                    text = await tokens.get()
+                    if text is None:
+                        return
+                    await ws.send_json({"type": "token", "text": text})
+
+            sender = asyncio.create_task(forward_tokens())
+            try:
+                response = await self.ask(session_id, message, tokens.put_nowait)
+                tokens.put_nowait(None)
+                await sender
+                await ws.send_json({"type": "done", "session": session_id, "response": response})
+            except ServerBusy:
+                sender.cancel()
+                await ws.send_json({
+                    "type": "error",
+                    "status": 429,
+                    "error": "Server busy, try again later",
+                    "retry_after": RETRY_AFTER
+                })
+
+        return ws
+
+    def build_app(self):
+        app = web.Application()
+        app.router.add_post("/chat", self.handle_chat)
+        app.router.add_get("/ws", self.handle_ws)
+        app.router.add_get("/status", self.handle_status)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/metrics.json", self.handle_metrics_json)
+        app.router.add_get("/sessions/{session}/history", self.handle_history)
+        app.router.add_post("/sessions/{session}/cancel", self.handle_cancel)
+        app.router.add_delete("/sessions/{session}", self.handle_clear)
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+
+    async def on_cleanup(self, app):
+        """Close the Ollama connection pool of the server's event loop"""
+        await close_async_client()
+
+# ------------------ Entry Point ------------------
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE):
+    """Start the JARVIS server (blocking)"""
+    if not AIOHTTP_AVAILABLE:
+        print("❌ aiohttp not available, server mode disabled")
+        return
+    server = JarvisServer(max_concurrent, max_queue)
+    start_model_lifecycle()
+    start_metrics_listener()
+    print(f"🌐 JARVIS server on http://{host}:{port} (concurrency={max_concurrent}, queue={max_queue})")
+    web.run_app(server.build_app(), host=host, port=port, print=None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JARVIS multi-session server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT)
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    args = parser.parse_args()
+    run_server(args.host, args.port, args.max_concurrent, args.max_queue)
@@ -0,0 +1,262 @@
+# jarvis_storage.py
+# SQLite (WAL) conversation store - append-only history and context per session
+import json
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+# ------------------ Configuration ------------------
+DATA_DIR = Path("jarvis_full_data")
+DATA_DIR.mkdir(exist_ok=True)
+
+DB_FILE = DATA_DIR / "jarvis.db"
+
+DEFAULT_SESSION = "default"
+HISTORY_WINDOW = 100  # Messages in the cached window, the token budget decides what is sent
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session, id);
+
+CREATE TABLE IF NOT EXISTS context (
+    session TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS summaries (
+    session TEXT PRIMARY KEY,
+    upto_id INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# ------------------ Conversation Store ------------------
+class ConversationStore:
+    """
+    Per-session chat history and conversation context in SQLite.
+    Messages are only ever inserted, the last `window` messages of each
+    session are cached in memory. WAL mode lets the UI and the CLI write
+    to the same database at the same time.
+    """
+
+    def __init__(self, db_path=DB_FILE, window=HISTORY_WINDOW):
+        self.db_path = Path(db_path)
+        self.window = window
+        self._lock = threading.RLock()
+        self._cache = {}
+
+        self._conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._data_version = self._read_data_version()
+
+    def _read_data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync_cache(self):
+        """Drop cached windows if another connection committed since last check"""
+        version = self._read_data_version()
+        if version != self._data_version:
+            self._cache.clear()
+            self._data_version = version
+
+    # ------------------ History ------------------
+    def _window(self, session):
+        """Cached deque of (id, role, content) for a session (lock must be held)"""
+        self._sync_cache()
+        window = self._cache.get(session)
+        if window is None:
+            rows = self._conn.execute(
+                "SELECT id, role, content FROM messages WHERE session = ? ORDER BY id DESC LIMIT ?",
+                (session, self.window)
+            ).fetchall()
+            window = deque(reversed(rows), maxlen=self.window)
+            self._cache[session] = window
+        return window
+
+    def recent(self, session=DEFAULT_SESSION):
+        """Return the active window of a session as a list of message dicts"""
+        with self._lock:
+            return [{"role": role, "content": content} for _, role, content in self._window(session)]
+
+    def recent_with_ids(self, session=DEFAULT_SESSION):
+        """Return the active window of a session as (id, role, content) tuples"""
+        with self._lock:
+            return list(self._window(session))
+
+    def messages_between(self, session, after_id, upto_id, limit=None):
+        """Messages with after_id < id <= upto_id as (id, role, content), oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, role, content FROM messages WHERE session = ? AND id > ? AND id <= ? "
+                "ORDER BY id LIMIT ?",
+                (session, after_id, upto_id, -1 if limit is None else limit)
+            ).fetchall()
+        return rows
+
+    def messages_after(self, after_id, limit=500):
+        """Messages of all sessions with id > after_id as (id, session, role, content), oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, session, role, content FROM messages WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            ).fetchall()
+
+    def messages_by_ids(self, ids):
+        """{id: (role, content, created)} for the given message ids"""
+        ids = list(ids)
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, role, content, created FROM messages WHERE id IN ({','.join('?' * len(ids))})",
+                ids
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def append(self, session, messages):
+        """Append messages to a session in one transaction"""
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self._sync_cache()
+            ids = []
+            with self._conn:
+                for m in messages:
+                    cursor = self._conn.execute(
+                        "INSERT INTO messages (session, role, content, created) VALUES (?, ?, ?, ?)",
+                        (session, m["role"], m["content"], now)
+                    )
+                    ids.append(cursor.lastrowid)
+            window = self._cache.get(session)
+            if window is not None:
+                window.extend((id_, m["role"], m["content"]) for id_, m in zip(ids, messages))
+
+    def replace(self, session, messages):
+        """Replace the whole stored history of a session"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM messages WHERE session = ?", (session,))
+            self._cache.pop(session, None)
+            if messages:
+                self.append(session, messages)
+
+    def clear(self, session=DEFAULT_SESSION):
+        """Delete all messages (and the summary) of a session"""
+        self.replace(session, [])
+        self.set_summary(session, 0, "")
+
+    def count(self, session=DEFAULT_SESSION):
+        """Number of stored messages in a session"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session = ?", (session,)
+            ).fetchone()[0]
+
+    def sessions(self):
+        """List all sessions that have stored messages"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT session FROM messages").fetchall()
+            return [row[0] for row in rows]
+
+    # ------------------ Context ------------------
+    def get_context(self, session=DEFAULT_SESSION, default=None):
+        """Load the conversation context dict of a session"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM context WHERE session = ?", (session,)
+            ).fetchone()
+        if row is None:
+            return default
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return default
+
+    def set_context(self, session, context):
+        """Store the conversation context dict of a session"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO context (session, data, updated) VALUES (?, ?, ?)",
+                    (session, json.dumps(context, ensure_ascii=False), datetime.utcnow().isoformat())
+                )
+
+    # ------------------ Summaries ------------------
+    def get_summary(self, session=DEFAULT_SESSION):
+        """Rolling summary of a session as (upto_id, summary), (0, "") if none"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT upto_id, summary FROM summaries WHERE session = ?", (session,)
+            ).fetchone()
+        return (row[0], row[1]) if row else (0, "")
+
+    def set_summary(self, session, upto_id, summary):
+        """Store the rolling summary covering all messages with id <= upto_id"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO summaries (session, upto_id, summary, updated) VALUES (?, ?, ?, ?)",
+                    (session, upto_id, summary, datetime.utcnow().isoformat())
+                )
+
+    # ------------------ Legacy JSON Import ------------------
+    def import_legacy_json(self, history_file, context_file, session=DEFAULT_SESSION):
+        """One-time import of chat_history.json / conversation_context.json"""
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'legacy_imported'"
+            ).fetchone()
+            if done:
+                return
+
+            imported = 0
+            try:
+                if Path(history_file).exists():
+                    with open(history_file, "r", encoding="utf-8") as f:
+                        history = json.load(f)
+                    messages = [
+                        m for m in history
+                        if isinstance(m, dict) and m.get("role") in ("user", "assistant")
+                    ]
+                    if messages:
+                        self.append(session, messages)
+                        imported = len(messages)
+            except Exception as e:
+                print(f"⚠ Legacy history import error: {e}")
+
+            try:
+                if Path(context_file).exists():
+                    with open(context_file, "r", encoding="utf-8") as f:
+                        context = json.load(f)
+                    if context:
+                        self.set_context(session, context)
+            except Exception as e:
+                print(f"⚠ Legacy context import error: {e}")
+
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)",
+                    (datetime.utcnow().isoformat(),)
+                )
+            if imported:
+                print(f"✓ Imported {imported} messages from {history_file}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,208 @@
+# jarvis_tools.py
+# System tool registry: alias -> handler dispatch, memoization and per-tool timing
+import functools
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+
+from jarvis_calc import CalcError, evaluate as calc_evaluate
+
+# ------------------ Tool Errors ------------------
+class ToolError(Exception):
+    """Raised by a tool handler to report a failure message to the model"""
+
+# ------------------ Tool Registry ------------------
+class Tool:
+    """A registered tool with its handler and usage counters"""
+
+    def __init__(self, name, handler, aliases=(), description="", example_args=None, pure=False):
+        self.name = name
+        self.handler = handler
+        self.aliases = tuple(aliases)
+        self.description = description
+        self.example_args = example_args
+        self.pure = pure
+        self.calls = 0
+        self.failures = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def usage(self):
+        """Tool call syntax as shown to the model, e.g. TOOL("calculate", "2+2*3")"""
+        if self.example_args is not None:
+            return f'TOOL("{self.name}", "{self.example_args}")'
+        return f'TOOL("{self.name}")'
+
+    def schema(self):
+        """Function definition for Ollama's `tools` parameter (one string argument, if any)"""
+        properties = {}
+        if self.example_args is not None:
+            properties["args"] = {"type": "string", "description": f'Argument, e.g. "{self.example_args}"'}
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {"type": "object", "properties": properties, "required": list(properties)}
+            }
+        }
+
+    def stats(self):
+        stats = {
+            "calls": self.calls,
+            "failures": self.failures,
+            "total_ms": round(self.total_time * 1000, 3),
+            "avg_ms": round(self.total_time * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_time * 1000, 3)
+        }
+        if self.pure:
+            info = self.handler.cache_info()
+            stats["cache_hits"] = info.hits
+            stats["cache_misses"] = info.misses
+        return stats
+
+class ToolRegistry:
+    def __init__(self):
+        self.tools = {}    # name -> Tool
+        self.aliases = {}  # name or alias -> Tool
+        self._lock = threading.Lock()
+
+    def register(self, name, aliases=(), description="", example_args=None, pure=False, cache_size=256):
+        """
+        Decorator registering a handler(args) -> str under a name and its aliases.
+        Pure tools (same args -> same result) are memoized.
+        """
+        def decorator(func):
+            handler = functools.lru_cache(maxsize=cache_size)(func) if pure else func
+            tool = Tool(name, handler, aliases, description, example_args, pure)
+            for key in (name,) + tuple(aliases):
+                key = key.lower()
+                if key in self.aliases:
+                    raise ValueError(f"Tool name already registered: {key}")
+                self.aliases[key] = tool
+            self.tools[name] = tool
+            return func
+        return decorator
+
+    def get(self, name):
+        return self.aliases.get(name.lower().strip())
+
+    def execute(self, tool_name, args=None):
+        """
+        Execute a tool by name or alias
+        Returns (success, result) tuple
+        """
+        tool = self.get(tool_name)
+        if tool is None:
+            return (False, f"Unknown tool: {tool_name.lower().strip()}")
+
+        failed = True
+        start = time.perf_counter()
+        try:
+            result = tool.handler(args)
+            failed = False
+            return (True, result)
+        except ToolError as e:
+            return (False, str(e))
+        except Exception as e:
+            return (False, f"Tool error: {str(e)}")
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                tool.calls += 1
+                tool.total_time += elapsed
+                tool.max_time = max(tool.max_time, elapsed)
+                if failed:
+                    tool.failures += 1
+
+    def stats(self):
+        """Call counts, latencies and cache hits per tool"""
+        with self._lock:
+            return {name: tool.stats() for name, tool in self.tools.items()}
+
+    def schemas(self):
+        """All tools as Ollama function definitions"""
+        return [tool.schema() for tool in self.tools.values()]
+
+    def describe(self):
+        """Tool list for the system prompt, one '- TOOL(...) - description' line per tool"""
+        return "\n".join(f"- {tool.usage()} - {tool.description}" for tool in self.tools.values())
+
+registry = ToolRegistry()
+tool = registry.register
+
+# ------------------ Date/Time Tools ------------------
+@tool("time", aliases=["get_time", "current_time"], description="Current time")
+def tool_time(args=None):
+    return datetime.now().strftime('%H:%M:%S')
+
+@tool("date", aliases=["get_date", "current_date"], description="Current date")
+def tool_date(args=None):
+    return datetime.now().strftime('%Y-%m-%d')
+
+@tool("datetime", aliases=["get_datetime"], description="Full date and time")
+def tool_datetime(args=None):
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+@tool("day", aliases=["weekday", "day_of_week"], description="Day of week")
+def tool_day(args=None):
+    return datetime.now().strftime('%A')
+
+@tool("year", description="Current year")
+def tool_year(args=None):
+    return str(datetime.now().year)
+
+@tool("month", description="Current month name")
+def tool_month(args=None):
+    return datetime.now().strftime('%B')
+
+@tool("timestamp", aliases=["unix_time"], description="Unix timestamp")
+def tool_timestamp(args=None):
+    return str(int(datetime.now().timestamp()))
+
+# ------------------ Math Tools ------------------
+@tool("calculate", aliases=["calc", "math"], description="Math calculations", example_args="2+2*3", pure=True)
+def tool_calculate(args=None):
+    if not args:
+        raise ToolError("No expression provided")
+    try:
+        # AST evaluator with operand, exponent and time limits (no eval)
+        return calc_evaluate(args)
+    except CalcError as e:
+        raise ToolError(str(e))
+
+# ------------------ System Info Tools ------------------
+@tool("system", aliases=["os", "platform"], description="Operating system info", pure=True)
+def tool_system(args=None):
+    return f"{platform.system()} {platform.release()}"
+
+@tool("python_version", description="Python version", pure=True)
+def tool_python_version(args=None):
+    return sys.version.split()[0]
+
+# ------------------ Public API ------------------
+def execute_system_tool(tool_name, args=None):
+    """
+    Execute system tools that JARVIS can use
+    Returns (success, result) tuple
+    """
+    return registry.execute(tool_name, args)
+
+def tool_label(tool_name):
+    """Registered name of a tool for metric labels, "unknown" for names the model made up"""
+    tool = registry.get(str(tool_name or ""))
+    return tool.name if tool is not None else "unknown"
+
+def get_tool_stats():
+    """Call counts, latencies and cache hits per tool"""
+    return registry.stats()
+
+def tool_schemas():
+    """Tool registry as Ollama `tools` definitions (native tool calling)"""
+    return registry.schemas()
+
+def tool_list_text():
+    """Generated 'Available tools' list for the system rules"""
+    return registry.describe()
@@ -6,26 +6,21 @@ import queue
 import json
 from pathlib import Path
 
-# Text-to-Speech
-TTS_AVAILABLE = False
+from jarvis_lazy import dependencies_present, lazy_module
+from jarvis_scheduler import CancelToken  # Könnyű modul, a jarvis_logic a háttérszálon töltődik be
+
+# Text-to-Speech - pyttsx3 (and its platform driver) is imported by init_tts
+pyttsx3 = lazy_module("pyttsx3")
+TTS_AVAILABLE = dependencies_present("pyttsx3")
 TTS_ENGINE = None
-try:
-    import pyttsx3
-    TTS_AVAILABLE = True
-except Exception as e:
-    print(f"TTS nem elérhető: {e}")
+if not TTS_AVAILABLE:
+    print("TTS nem elérhető: pip install pyttsx3")
 
-# Voice Recognition - Import from module
-try:
-    from jarvis_voice_recognition import (
-        record_audio,
-        transcribe_audio,
-        VOICE_AVAILABLE as VOICE_RECOGNITION_AVAILABLE
-    )
-    print("✓ Voice recognition module loaded")
-except Exception as e:
-    VOICE_RECOGNITION_AVAILABLE = False
-    print(f"⚠ Voice recognition not available: {e}")
+# Voice Recognition - whisper (and torch) are imported on first use or by the
+# startup prewarm thread, here we only check that the packages are installed
+VOICE_RECOGNITION_AVAILABLE = dependencies_present("whisper", "pyaudio", "numpy")
+if not VOICE_RECOGNITION_AVAILABLE:
+    print("⚠ Voice recognition not available")
     print("Install with: pip install openai-whisper pyaudio")
 
 # ------------------ Beszéd funkció ------------------
@@ -34,7 +29,6 @@ def init_tts():
     global TTS_ENGINE
     if TTS_AVAILABLE and TTS_ENGINE is None:
         try:
-            import pyttsx3
             TTS_ENGINE = pyttsx3.init()
             TTS_ENGINE.setProperty('rate', 150)
             TTS_ENGINE.setProperty('volume', 0.9)
@@ -120,6 +114,9 @@ class JarvisGUI:
         # Recording state
         self.is_recording = False
         
+        # Stop signal of the running askAI turn (None while idle)
+        self.cancel_token = None
+        
         # Streaming state
         self.current_stream_message = ""
         self.stream_sender = None
@@ -226,6 +223,20 @@ class JarvisGUI:
         )
         self.send_button.pack(side=tk.RIGHT)
         
+        # Stop button (enabled while JARVIS is answering)
+        self.stop_button = tk.Button(
+            self.input_frame,
+            text="⏹ Stop",
+            font=("Arial", 12, "bold"),
+            bg="#aa0000",
+            fg="white",
+            command=self.stop_generation,
+            width=8,
+            state=tk.DISABLED
+        )
+        self.stop_button.pack(side=tk.RIGHT, padx=(0, 5))
+        self.root.bind("<Escape>", lambda e: self.stop_generation())
+        
         # Settings frame
         self.settings_frame = tk.Frame(self.root, bg="#1a1a1a")
         self.settings_frame.pack(pady=5, padx=20, fill=tk.X)
@@ -506,6 +517,13 @@ class JarvisGUI:
             self.root.after(0, lambda: self.record_button.config(bg="#aa0000", text="🎤"))
             self.root.after(0, lambda: self.status_label.config(text="● Online", fg="#00ff00"))
     
+    def stop_generation(self):
+        """Stop the running answer (Ollama stream and pending searches)"""
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.stop_button.config(state=tk.DISABLED)
+            self.status_label.config(text="⏹ Stopping...", fg="#ffaa00")
+    
     def send_message(self):
         """Send user message"""
         user_input = self.input_entry.get().strip()
@@ -522,52 +540,53 @@ class JarvisGUI:
         # Disable input while processing
         self.input_entry.config(state=tk.DISABLED)
         self.send_button.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.NORMAL)
         self.status_label.config(text="🤔 Thinking...", fg="#ffaa00")
         
         # Process input in background
+        self.cancel_token = CancelToken()
         threading.Thread(
             target=self.process_input,
-            args=(user_input, tts_enabled, stream_enabled),
+            args=(user_input, tts_enabled, stream_enabled, self.cancel_token),
             daemon=True
         ).start()
     
-    def process_input(self, user_input, tts_enabled, stream_enabled):
+    def process_input(self, user_input, tts_enabled, stream_enabled, cancel_token):
         """Process user input and get AI response"""
         from jarvis_logic import askAI
-        import time
         
         try:
-            full_response = ""
-            
             # Use streaming if enabled
             if stream_enabled:
                 # Signal start of stream
                 self.stream_queue.put("__START__")
                 
-                # Capture streaming response
+                # Capture streaming response (tokens arrive as Ollama generates them)
+                streamed = False
                 def capture_stream(text):
-                    nonlocal full_response
-                    full_response += text
+                    nonlocal streamed
+                    streamed = True
                     self.stream_callback(text)
-                    # Small delay for smooth streaming
-                    time.sleep(0.05)
                 
-                # Get response with streaming (if your askAI supports it)
-                # Note: You'll need to modify askAI to accept a callback
-                response = askAI(user_input, stream_callback=capture_stream)
-                full_response = response if not full_response else full_response
+                response = askAI(user_input, stream_callback=capture_stream, cancel_token=cancel_token)
+                if not streamed and response:
+                    self.stream_callback(response)  # Answers that never streamed (errors)
+                if cancel_token.cancelled:
+                    self.stream_callback(" ⏹")
                 
                 # Signal end of stream
                 self.stream_queue.put("__END__")
             else:
                 # Get response without streaming
-                response = askAI(user_input)
-                full_response = response
-                self.root.after(0, lambda r=response: self.add_message("JARVIS", r))
+                response = askAI(user_input, cancel_token=cancel_token)
+                shown = f"{response} ⏹".strip() if cancel_token.cancelled else response
+                self.root.after(0, lambda r=shown: self.add_message("JARVIS", r))
             
-            # Queue TTS (will be spoken in main thread)
-            if tts_enabled and full_response and TTS_ENGINE:
-                self.tts_queue.put(full_response)
+            # Queue TTS (will be spoken in main thread), stopped answers stay silent.
+            # The returned answer is spoken, not the stream: text streamed before a
+            # TOOL()/SEARCH() request is not part of the answer
+            if tts_enabled and response and TTS_ENGINE and not cancel_token.cancelled:
+                self.tts_queue.put(response)
         
         except Exception as e:
             import traceback
@@ -578,6 +597,8 @@ class JarvisGUI:
         
         finally:
             # Re-enable input
+            self.cancel_token = None
+            self.root.after(0, lambda: self.stop_button.config(state=tk.DISABLED))
             self.root.after(0, lambda: self.input_entry.config(state=tk.NORMAL))
             self.root.after(0, lambda: self.send_button.config(state=tk.NORMAL))
             self.root.after(0, lambda: self.status_label.config(text="● Online", fg="#00ff00"))
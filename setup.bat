@@ -48,16 +48,16 @@ if %errorLevel% == 0 (
     for /f "tokens=2" %%i in ('python --version 2^>^&1') do set PYTHON_VERSION=%%i
     echo [OK] Python !PYTHON_VERSION! found
     
-    REM Check Python version (needs 3.8+)
+    REM Check Python version (needs 3.11+, Task.cancelling/uncancel)
     for /f "tokens=1 delims=." %%a in ("!PYTHON_VERSION!") do set MAJOR=%%a
     for /f "tokens=2 delims=." %%a in ("!PYTHON_VERSION!") do set MINOR=%%a
     
     if !MAJOR! LSS 3 (
-        echo [ERROR] Python 3.8+ required, found !PYTHON_VERSION!
+        echo [ERROR] Python 3.11+ required, found !PYTHON_VERSION!
         goto :error_python
     )
-    if !MAJOR! EQU 3 if !MINOR! LSS 8 (
-        echo [ERROR] Python 3.8+ required, found !PYTHON_VERSION!
+    if !MAJOR! EQU 3 if !MINOR! LSS 11 (
+        echo [ERROR] Python 3.11+ required, found !PYTHON_VERSION!
         goto :error_python
     )
 ) else (
@@ -399,7 +399,7 @@ echo ============================================================
 echo PYTHON NOT FOUND OR VERSION TOO OLD
 echo ============================================================
 echo.
-echo Please install Python 3.8 or newer:
+echo Please install Python 3.11 or newer:
 echo   Download from: https://www.python.org/downloads/
 echo.
 echo IMPORTANT: During installation, check:
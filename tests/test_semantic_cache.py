@@ -0,0 +1,65 @@
+# tests/test_semantic_cache.py
+# Semantic response cache: answers never cross sessions or depend on earlier turns
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import jarvis_logic
+from jarvis_cache import SemanticCache
+
+VECTOR = [1.0, 0.0, 0.0, 0.0]
+
+# ------------------ SemanticCache ------------------
+def test_cache_scope_separates_sessions():
+    cache = SemanticCache(max_entries=8, threshold=0.9)
+    cache.put(VECTOR, "What's my name?", "Your name is Alice.", model="m", scope="alice")
+
+    assert cache.get(VECTOR, "m", scope="alice")[0] == "Your name is Alice."
+    assert cache.get(VECTOR, "m", scope="bob")[0] is None
+    assert cache.get(VECTOR, "m")[0] is None
+
+def test_cache_scope_survives_persistence(tmp_path):
+    path = tmp_path / "semantic_cache.json"
+    cache = SemanticCache(max_entries=8, threshold=0.9, path=path)
+    cache.put(VECTOR, "What's my name?", "Your name is Alice.", model="m", scope="alice")
+
+    reloaded = SemanticCache(max_entries=8, threshold=0.9, path=path)
+    assert reloaded.get(VECTOR, "m", scope="alice")[0] == "Your name is Alice."
+    assert reloaded.get(VECTOR, "m", scope="bob")[0] is None
+
+# ------------------ askAI Integration ------------------
+class FakeStore:
+    def __init__(self, counts):
+        self.counts = counts
+
+    def count(self, session):
+        return self.counts.get(session, 0)
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = SemanticCache(max_entries=8, threshold=0.9)
+    monkeypatch.setattr(jarvis_logic, "get_semantic_cache", lambda config: cache)
+    monkeypatch.setattr(jarvis_logic, "embed_text", lambda text, config, priority=None: VECTOR)
+    return cache
+
+def test_sessions_do_not_share_personal_answers(cache, monkeypatch):
+    monkeypatch.setattr(jarvis_logic, "get_store", lambda: FakeStore({}))
+    config = {"model": "m"}
+
+    vector = asyncio.run(jarvis_logic.semantic_cache_lookup("What's my name?", "alice", config))[1]
+    asyncio.run(jarvis_logic.semantic_cache_store(vector, "What's my name?", "Your name is Alice.", "alice", config))
+
+    answer, _ = asyncio.run(jarvis_logic.semantic_cache_lookup("What's my name?", "bob", config))
+    assert answer is None
+    answer, _ = asyncio.run(jarvis_logic.semantic_cache_lookup("What's my name?", "alice", config))
+    assert answer == "Your name is Alice."
+
+def test_follow_ups_are_not_looked_up(cache, monkeypatch):
+    cache.put(VECTOR, "tell me more", "More about dragons...", model="m", scope="alice")
+    monkeypatch.setattr(jarvis_logic, "get_store", lambda: FakeStore({"alice": 4}))
+
+    answer, vector = asyncio.run(jarvis_logic.semantic_cache_lookup("tell me more", "alice", {"model": "m"}))
+    assert answer is None
+    assert vector is None  # No embedding, so the answer can't be stored either